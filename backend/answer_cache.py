@@ -0,0 +1,114 @@
+import json, sqlite3, time
+from array import array
+from contextlib import contextmanager
+import numpy as np
+
+class AnswerCache:
+    """
+    Semantic cache of the `/question` answers, stored in a local SQLite file.
+
+    A question is embedded with the same model used for the resumes; if a question answered before has a cosine
+    similarity of at least `threshold` with it, the stored answer is returned instead of running the agent again.
+
+    Answers are tied to the corpus version they were computed on. `bump_corpus_version()` is called whenever resumes
+    are added, changed or deleted, which invalidates every stored answer at once. The version lives in the same file,
+    so it is shared by every process using it.
+
+    Args:
+        db_path (str): SQLite file holding the answers and the corpus version.
+        embeddings (Embeddings): Model used to embed the questions.
+        threshold (float): Minimum cosine similarity for a cache hit.
+        max_entries (int): Answers kept; the least recently used ones are evicted first.
+        max_age_seconds (float): Answers older than this are never returned.
+    """
+
+    def __init__(self, db_path, embeddings, threshold=0.95, max_entries=1000, max_age_seconds=24 * 3600):
+        self.db_path = db_path
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS answers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    corpus_version INTEGER NOT NULL,
+                    query TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_version ON answers (corpus_version)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('corpus_version', 0)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def corpus_version(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'corpus_version'").fetchone()[0]
+
+    def bump_corpus_version(self):
+        """Marks the corpus as changed: every stored answer stops being returned and is removed."""
+        with self._connect() as conn:
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'corpus_version'")
+            conn.execute(
+                "DELETE FROM answers WHERE corpus_version < (SELECT value FROM meta WHERE key = 'corpus_version')"
+            )
+
+    def embed(self, query):
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, query_vector, corpus_version):
+        """
+        Returns (response dict, similarity) of the most similar stored question of `corpus_version`, or None if no
+        question reaches the threshold.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, embedding FROM answers WHERE corpus_version = ? AND created_at > ?",
+                (corpus_version, time.time() - self.max_age_seconds),
+            ).fetchall()
+            if not rows:
+                return None
+            matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), -1)
+            similarities = matrix @ query_vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            answer_id = rows[best][0]
+            conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), answer_id))
+            response = conn.execute("SELECT response FROM answers WHERE id = ?", (answer_id,)).fetchone()[0]
+        return json.loads(response), float(similarities[best])
+
+    def store(self, query, query_vector, response, corpus_version):
+        """Stores the answer of a question, computed on `corpus_version` (read before running the agent)."""
+        now = time.time()
+        with self._connect() as conn:
+            current = conn.execute("SELECT value FROM meta WHERE key = 'corpus_version'").fetchone()[0]
+            if corpus_version != current:
+                return  #the corpus changed while the agent was running, this answer may already be stale
+            conn.execute(
+                "INSERT INTO answers (corpus_version, query, embedding, response, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (corpus_version, query, array("f", query_vector.tolist()).tobytes(),
+                 json.dumps(response, ensure_ascii=False), now, now),
+            )
+            conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.max_age_seconds,))
+            conn.execute(
+                "DELETE FROM answers WHERE id NOT IN (SELECT id FROM answers ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
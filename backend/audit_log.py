@@ -0,0 +1,140 @@
+import json, os, queue, threading
+from datetime import datetime, timezone
+
+ACTIVE_FILE = "current.jsonl"
+
+class AuditLog:
+    """
+    Append-only audit log stored as JSON Lines files, replacing the TinyDB question log.
+
+    `log(record)` only puts the record in memory, so request handlers never wait on the disk. A background thread
+    appends the pending records in batches, every `flush_interval` seconds or as soon as `batch_size` records are
+    waiting. When the active file grows past `max_bytes` it is renamed after the UTC time of the rotation
+    (e.g. `20250101T120000.000000Z.jsonl`), so every rotated file only holds records older than its name.
+
+    Records must have an ISO 8601 `timestamp` in UTC.
+
+    Args:
+        dir_path (str): Folder of the log files.
+        max_bytes (int): Size of the active file that triggers a rotation.
+        flush_interval (float): Maximum seconds a record waits in memory.
+        batch_size (int): Records that trigger a flush before `flush_interval`.
+    """
+
+    def __init__(self, dir_path, max_bytes=50 * 1024 * 1024, flush_interval=1.0, batch_size=200):
+        self.dir_path = dir_path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        os.makedirs(dir_path, exist_ok=True)
+        self._pending = queue.Queue()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the writer thread after writing every pending record."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def log(self, record):
+        self._pending.put(record)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.flush_interval)  #woken early by stop()
+            self.flush()
+
+    def flush(self):
+        """Appends every pending record to the active file. Returns the number of records written."""
+        records = []
+        while True:
+            try:
+                records.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        if not records:
+            return 0
+        with self._write_lock:
+            for i in range(0, len(records), self.batch_size):
+                lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records[i : i + self.batch_size])
+                with open(os.path.join(self.dir_path, ACTIVE_FILE), "a", encoding="utf-8") as f:
+                    f.write(lines)
+                    size = f.tell()
+                if size >= self.max_bytes:
+                    self._rotate()
+        return len(records)
+
+    def _rotate(self):
+        rotated_at = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%fZ")
+        os.replace(os.path.join(self.dir_path, ACTIVE_FILE), os.path.join(self.dir_path, f"{rotated_at}.jsonl"))
+
+    def _files(self):
+        """Returns (path, rotated_at) of the log files, newest first. The active file has rotated_at None."""
+        rotated = sorted((name for name in os.listdir(self.dir_path) if name.endswith("Z.jsonl")), reverse=True)
+        files = [(os.path.join(self.dir_path, ACTIVE_FILE), None)]
+        for name in rotated:
+            rotated_at = datetime.strptime(name[: -len(".jsonl")], "%Y%m%dT%H%M%S.%fZ").replace(tzinfo=timezone.utc)
+            files.append((os.path.join(self.dir_path, name), rotated_at))
+        return files
+
+    def query(self, user_uuid=None, since=None, until=None, limit=100):
+        """
+        Returns up to `limit` records, newest first, optionally only the ones of a user and within a time range.
+
+        Rotated files entirely older than `since` are not read.
+
+        Args:
+            user_uuid (str): Only records with this `user_uuid`.
+            since (datetime): Only records at or after this time (timezone aware).
+            until (datetime): Only records before this time (timezone aware).
+            limit (int): Maximum number of records.
+        """
+        self.flush()
+        results = []
+        for path, rotated_at in self._files():
+            if since is not None and rotated_at is not None and rotated_at < since:
+                break  #this file and every older one end before `since`
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            for record in reversed(records):
+                if user_uuid is not None and record.get("user_uuid") != user_uuid:
+                    continue
+                timestamp = datetime.fromisoformat(record["timestamp"])
+                if since is not None and timestamp < since or until is not None and timestamp >= until:
+                    continue
+                results.append(record)
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def migrate_from_tinydb(self, path):
+        """
+        Imports the records of the old TinyDB question log once, while the audit log is still empty.
+        Returns the number of records imported. An empty or unreadable file (TinyDB creates it empty before the first
+        question) has nothing to import.
+        """
+        if not os.path.exists(path) or any(name.endswith(".jsonl") for name in os.listdir(self.dir_path)):
+            return 0
+        try:
+            with open(path, encoding="utf-8") as f:
+                tables = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return 0
+        if not isinstance(tables, dict):
+            return 0
+        records = sorted(tables.get("_default", {}).values(), key=lambda record: record.get("timestamp", ""))
+        for record in records:
+            self.log(record)
+        self.flush()
+        return len(records)
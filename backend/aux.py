@@ -1,28 +1,122 @@
-from langchain_community.document_loaders import JSONLoader
+import hashlib
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-def load_json_with_jsonloader(file_path, jq_schema='.'):
+# (field, label) of the ResumeData fields turned into chunks. Fields in RESUME_ENTRY_FIELDS get one chunk per entry,
+# the other list fields are joined in a single chunk.
+RESUME_CHUNK_FIELDS = [
+    ("professional_summary", "Professional summary"),
+    ("work_experience", "Work experience"),
+    ("projects", "Project"),
+    ("education", "Education"),
+    ("technical_skills", "Technical skills"),
+    ("soft_skills", "Soft skills"),
+    ("certifications", "Certifications"),
+    ("languages", "Languages"),
+    ("achievements", "Achievements"),
+]
+RESUME_ENTRY_FIELDS = {"work_experience", "projects"}
+# Bumped whenever chunk_resume changes its output, so the stored resumes are chunked again on the next start
+# (1: 150-character pieces of the raw JSON, 2: one chunk per ResumeData field)
+CHUNKING_VERSION = 2
+
+def chunk_resume(resume, source, max_chars=1000):
+    """
+    Split a structured resume (ResumeData as dict) into one chunk per semantic unit
+    (profile, summary, each work experience and project, education, each skills list, ...).
+    Every chunk starts with the candidate name and the field label (repeated on the pieces of split units), and carries `field`, `full_name` and `source`
+    in its metadata. Empty fields are skipped and units longer than `max_chars` are split.
+    """
+    full_name = resume.get("full_name") or ""
+
+    units = []
+    profile = [resume.get(key) for key in ("full_name", "current_position", "address")]
+    if any(profile):
+        units.append(("profile", "Profile", " - ".join(value for value in profile if value)))
+
+    for field, label in RESUME_CHUNK_FIELDS:
+        value = resume.get(field)
+        if not value:
+            continue
+        if isinstance(value, str):
+            units.append((field, label, value))
+        elif field in RESUME_ENTRY_FIELDS:
+            units.extend((field, label, entry) for entry in value if entry)
+        else:
+            units.append((field, label, ", ".join(entry for entry in value if entry)))
+
+    chunks = []
+    for field, label, text in units:
+        header = f"{full_name} | {label}: " if full_name else f"{label}: "
+        splitter = RecursiveCharacterTextSplitter(chunk_size=max(max_chars - len(header), 100), chunk_overlap=0)
+        for piece in splitter.split_text(text):
+            chunks.append(Document(
+                page_content=header + piece,
+                metadata={"source": source, "field": field, "full_name": full_name},
+            ))
+    return chunks
+
+
+def chunk_ids(source, chunks):
     """
-    Load JSON using LangChain's JSONLoader
-    jq_schema: JQ schema to extract specific fields (default: '.' for entire document)
+    Deterministic IDs for the chunks of a source: the SHA-256 of the source name and the chunk content.
+    Chunks repeated inside the same source are dropped, since they would share the same ID.
     """
-    loader = JSONLoader(
-        file_path=file_path,
-        jq_schema=jq_schema,
-        text_content=False  # Set to True if you want to extract text content only
-    )
-    documents = loader.load()
-    return documents
+    ids, unique_chunks, seen = [], [], set()
+    for chunk in chunks:
+        chunk_id = hashlib.sha256(f"{source}\x00{chunk.page_content}".encode()).hexdigest()
+        if chunk_id not in seen:
+            seen.add(chunk_id)
+            ids.append(chunk_id)
+            unique_chunks.append(chunk)
+    return ids, unique_chunks
+
+
+def upsert_chunks(vector_store, source, chunks, legacy_sources=(), lexical_index=None, embedding_model=None):
+    """
+    Makes the vector store hold exactly `chunks` for `source`.
+    Chunks that are already stored are kept as they are (no new embedding), new ones are added and the ones that are
+    no longer present are deleted, including chunks stored under any of the `legacy_sources` names.
+    With `embedding_model`, every chunk records it in its metadata, and stored chunks embedded by another model (or
+    before the model was recorded) are embedded again instead of kept.
+    If a `lexical_index` (BM25Index) is given, it is updated with the same chunks and IDs.
+    """
+    for chunk in chunks:
+        chunk.metadata["source"] = source
+        if embedding_model is not None:
+            chunk.metadata["embedding_model"] = embedding_model
+    ids, chunks = chunk_ids(source, chunks)
+
+    stored = vector_store.get(where={"source": {"$in": [source, *legacy_sources]}}, include=["metadatas"])
+    existing = set(stored["ids"])
+    current = {
+        chunk_id for chunk_id, metadata in zip(stored["ids"], stored["metadatas"])
+        if embedding_model is None or (metadata or {}).get("embedding_model") == embedding_model
+    }
+    stale = existing - set(ids)
+    if stale:
+        vector_store.delete(ids=list(stale))
+
+    new = [(chunk_id, chunk) for chunk_id, chunk in zip(ids, chunks) if chunk_id not in current]
+    if new:
+        vector_store.add_documents(documents=[chunk for _, chunk in new], ids=[chunk_id for chunk_id, _ in new])
+
+    if lexical_index is not None:
+        lexical_index.delete(stale)
+        lexical_index.add(ids, chunks)
+
+    reembedded = sum(chunk_id in existing for chunk_id, _ in new)
+    return {"added": len(new) - reembedded, "removed": len(stale), "kept": len(ids) - len(new), "reembedded": reembedded}
 
 
-def chunk_documents(documents, chunk_size=1000, chunk_overlap=200):
+def delete_chunks(vector_store, sources, lexical_index=None):
     """
-    Split documents into chunks
+    Removes every chunk stored for any of the given sources (also from the `lexical_index`, if given).
+    Returns the number of deleted chunks.
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap
-    )
-    
-    chunked_docs = text_splitter.split_documents(documents)
-    return chunked_docs
+    ids = vector_store.get(where={"source": {"$in": list(sources)}}, include=[])["ids"]
+    if ids:
+        vector_store.delete(ids=ids)
+        if lexical_index is not None:
+            lexical_index.delete(ids)
+    return len(ids)
@@ -0,0 +1,146 @@
+"""
+Accuracy/latency comparison of the embedding backends (see docs/embedding_backends.md).
+
+Embeds the chunks of a sample of processed resumes and a set of recruiter-like queries with every backend, each one
+in a fresh process so load time and memory are measured in isolation, and compares them against `torch`.
+
+Usage (from the backend folder):
+    python -m benchmarks.embedding_backends --resumes-dir resumes_processed --sample 50 --output report.md
+"""
+import argparse, json, math, multiprocessing as mp, os, random, resource, statistics, time
+
+from aux import chunk_resume
+from embeddings import EMBEDDING_BACKENDS, DEFAULT_ONNX_INT8_FILE, build_embedding_model
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_QUERIES = [
+    "Python developer",
+    "React frontend developer",
+    "AWS cloud infrastructure",
+    "Kubernetes and Docker",
+    "data scientist with NLP experience",
+    "senior backend engineer",
+    "machine learning engineer",
+    "fluent English",
+    "project management and agile",
+    "SQL and relational databases",
+]
+
+def load_sample(resumes_dir, sample, seed):
+    files = sorted(f for f in os.listdir(resumes_dir) if f.endswith(".json"))
+    random.Random(seed).shuffle(files)
+    texts = []
+    for fname in files[:sample]:
+        with open(os.path.join(resumes_dir, fname), encoding="utf-8") as f:
+            texts.extend(chunk.page_content for chunk in chunk_resume(json.load(f), fname))
+    return texts
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  #ru_maxrss is in KB on Linux
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def run_backend(backend, texts, queries, batch_size, onnx_file):
+    """Runs in a child process: loads one backend and measures it."""
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    model = build_embedding_model(MODEL_NAME, backend=backend, encode_kwargs={"batch_size": batch_size},
+                                  onnx_int8_file=onnx_file)
+    model.embed_query("warm up")
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc_vectors = model.embed_documents(texts)
+    docs_seconds = time.perf_counter() - start
+
+    query_vectors, query_latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(model.embed_query(query))
+        query_latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "docs_per_second": len(texts) / docs_seconds if docs_seconds else float("inf"),
+        "query_p50_ms": percentile(query_latencies, 50),
+        "query_p95_ms": percentile(query_latencies, 95),
+        "rss_mb": peak_rss_mb() - rss_before,
+        "doc_vectors": doc_vectors,
+        "query_vectors": query_vectors,
+    }
+
+def cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    return dot / (math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b)))
+
+def top_k(query_vector, doc_vectors, k):
+    scores = [cosine(query_vector, doc) for doc in doc_vectors]
+    return set(sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:k])
+
+def compare(reference, result, k):
+    similarities = [cosine(a, b) for a, b in zip(reference["doc_vectors"], result["doc_vectors"])]
+    overlaps = [
+        len(top_k(ref_q, reference["doc_vectors"], k) & top_k(q, result["doc_vectors"], k)) / k
+        for ref_q, q in zip(reference["query_vectors"], result["query_vectors"])
+    ]
+    return statistics.mean(similarities), min(similarities), statistics.mean(overlaps)
+
+def render_report(results, texts, queries, k):
+    reference = results[0]
+    lines = [
+        f"Embedding backends compared on {len(texts)} chunks and {len(queries)} queries ({MODEL_NAME}).",
+        "",
+        f"| Backend | Load (s) | Chunks/s | Query p50 (ms) | Query p95 (ms) | Peak RSS (MB) | Mean cos vs torch | Min cos vs torch | Top-{k} overlap |",
+        "|---------|----------|----------|----------------|----------------|---------------|-------------------|------------------|-----------------|",
+    ]
+    for result in results:
+        mean_cos, min_cos, overlap = compare(reference, result, k)
+        lines.append(
+            f"| {result['backend']} | {result['load_seconds']:.2f} | {result['docs_per_second']:.1f} "
+            f"| {result['query_p50_ms']:.2f} | {result['query_p95_ms']:.2f} | {result['rss_mb']:.0f} "
+            f"| {mean_cos:.4f} | {min_cos:.4f} | {overlap:.2f} |"
+        )
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes-dir", default="resumes_processed")
+    parser.add_argument("--sample", type=int, default=50, help="Number of resumes sampled from the folder")
+    parser.add_argument("--queries", help="Text file with one query per line (defaults to a built-in set)")
+    parser.add_argument("--backends", default=",".join(EMBEDDING_BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--onnx-file", default=DEFAULT_ONNX_INT8_FILE)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the markdown report to this file instead of stdout")
+    args = parser.parse_args()
+
+    texts = load_sample(args.resumes_dir, args.sample, args.seed)
+    if not texts:
+        parser.error(f"No resume chunks found in {args.resumes_dir}")
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = DEFAULT_QUERIES
+
+    backends = ["torch"] + [b for b in args.backends.split(",") if b and b != "torch"]
+    results = []
+    for backend in backends:
+        # A fresh process per backend, so the memory and load time of one does not leak into the next
+        with mp.get_context("spawn").Pool(1) as pool:
+            results.append(pool.apply(run_backend, (backend, texts, queries, args.batch_size, args.onnx_file)))
+        print(f"{backend}: done", flush=True)
+
+    report = render_report(results, texts, queries, min(args.top_k, len(texts)))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    main()
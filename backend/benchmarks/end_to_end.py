@@ -0,0 +1,379 @@
+"""
+Offline end-to-end benchmark of the ingestion and query paths (see docs/benchmarks.md).
+
+Generates a synthetic corpus of resume PDFs (or PNGs), then, for each corpus size, starts the API in a fresh process
+and drives `upload_files`, `list_resumes` and `ask_question` the same way the HTTP routes do. Gemini, the agent's chat
+model and, by default, the OCR and the embedding model are replaced by the deterministic stand-ins of
+`benchmarks/stand_ins.py`, so runs need no network and are reproducible.
+
+Usage (from the backend folder):
+    python -m benchmarks.end_to_end --sizes 50,200,1000 --output benchmark_report.md
+"""
+import argparse, asyncio, json, multiprocessing as mp, os, resource, shutil, sys, tempfile, time
+from contextlib import contextmanager
+from datetime import datetime
+
+from content_cache import sha256_file
+from benchmarks.embedding_backends import peak_rss_mb, percentile
+from benchmarks.stand_ins import synthetic_resume, resume_lines
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER_UUID = "benchmark-user"
+LINES_PER_PAGE = 45
+DEFAULT_QUESTIONS = [
+    "Who are the best Python backend developers?",
+    "Find candidates with React and TypeScript experience",
+    "Which candidates know AWS and Kubernetes?",
+    "Data scientists fluent in English",
+    "Senior DevOps engineers with Terraform",
+    "Machine learning engineers with PyTorch",
+    "Mobile developers with Kotlin or Swift",
+    "Candidates with a Scrum Master certification",
+    "Data engineers who worked with Spark and Kafka",
+    "Full stack developers with Node.js and PostgreSQL",
+]
+# Settings the API reads at import time. Values already in the environment win, so any of them can be benchmarked.
+DEFAULT_ENV = {
+    "GEMINI_API_KEY": "offline-benchmark",
+    "GEMINI_RPM": "100000",  #the stand-in has no quota, the real limits would only measure the throttle
+    "GEMINI_TPM": "100000000",
+    "ANSWER_CACHE_THRESHOLD": "0",  #every question runs the agent, unless --answer-cache is given
+    "AUDIT_LOG_FLUSH_INTERVAL": "0.2",
+}
+
+def _pdf_text(text):
+    return text.encode("cp1252", "replace").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+def write_pdf(path, lines):
+    """Writes a minimal text PDF (Helvetica, A4, LINES_PER_PAGE lines per page), with no external dependency."""
+    pages = [lines[i : i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    page_ids = []
+    for page in pages:
+        stream = b"BT /F1 10 Tf 14 TL 50 800 Td " + b"".join(b"(" + _pdf_text(line) + b") Tj T* " for line in page) + b"ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+                       b"/Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids))
+
+    output, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(output)
+
+def write_png(path, lines):
+    """Renders the first page of the resume to a PNG, like a scanned or photographed resume."""
+    import pypdfium2 as pdfium  #also needs Pillow, only required for --format png/mixed
+    pdf_path = path + ".pdf"
+    write_pdf(pdf_path, lines[:LINES_PER_PAGE])
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        pdf[0].render(scale=2.0).to_pil().save(path)
+    finally:
+        pdf.close()
+        os.remove(pdf_path)
+
+def build_corpus(corpus_dir, size, file_format, seed):
+    """Writes `size` synthetic resumes. Returns the manifest: a list of (path, content type) and {sha256: lines}."""
+    os.makedirs(corpus_dir, exist_ok=True)
+    files, lines_by_hash = [], {}
+    for index in range(size):
+        lines = resume_lines(synthetic_resume(index, seed))
+        as_png = file_format == "png" or file_format == "mixed" and index % 2
+        path = os.path.join(corpus_dir, f"resume_{index:05d}.{'png' if as_png else 'pdf'}")
+        if not os.path.exists(path):
+            (write_png if as_png else write_pdf)(path, lines)
+        files.append((path, "image/png" if as_png else "application/pdf"))
+        lines_by_hash[sha256_file(path)] = lines
+    return files, lines_by_hash
+
+def recording_stage(ingest_stage, durations):
+    """Wraps metrics.ingest_stage to also keep the duration of every stage in `durations`."""
+    @contextmanager
+    def stage(name, job_id):
+        start = time.perf_counter()
+        try:
+            with ingest_stage(name, job_id):
+                yield
+        finally:
+            durations.setdefault(name, []).append(time.perf_counter() - start)
+    return stage
+
+def summarize(values, seconds=None):
+    """Count, throughput over the wall time of the phase (if given) and latency percentiles in ms."""
+    return {
+        "count": len(values),
+        "throughput": len(values) / seconds if seconds else None,
+        "p50_ms": percentile(values, 50) * 1000 if values else None,
+        "p95_ms": percentile(values, 95) * 1000 if values else None,
+        "p99_ms": percentile(values, 99) * 1000 if values else None,
+    }
+
+def multipart_request(files, chunk_size=1024 * 1024):
+    """A Starlette request posting `files` [(path, content type)] in the `files` field, streamed from disk like uvicorn would."""
+    from starlette.requests import Request
+    boundary = "benchmark-" + os.urandom(8).hex()
+
+    def body():
+        for path, content_type in files:
+            yield (f"--{boundary}\r\nContent-Disposition: form-data; name=\"files\"; filename=\"{os.path.basename(path)}\"\r\n"
+                   f"Content-Type: {content_type}\r\n\r\n").encode()
+            with open(path, "rb") as f:
+                while chunk := f.read(chunk_size):
+                    yield chunk
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode()
+
+    parts = body()
+
+    async def receive():
+        chunk = next(parts, None)
+        return {"type": "http.request", "body": chunk or b"", "more_body": chunk is not None}
+
+    scope = {"type": "http", "method": "POST", "path": "/upload", "query_string": b"",
+             "headers": [(b"content-type", f"multipart/form-data; boundary={boundary}".encode())]}
+    return Request(scope, receive)
+
+async def drive(main, files, options, durations):
+    results = {}
+    async with main.lifespan(main.app):
+        results["startup_rss_mb"] = peak_rss_mb()
+
+        # Ingestion: upload in batches like the frontend, then wait for every job to finish
+        upload_seconds, job_ids = [], []
+        ingest_start = time.perf_counter()
+        for i in range(0, len(files), options["upload_batch"]):
+            request = multipart_request(files[i : i + options["upload_batch"]])
+            start = time.perf_counter()
+            response = await main.upload_files(request=request, user_uuid=USER_UUID)
+            upload_seconds.append(time.perf_counter() - start)
+            job_ids.extend(job.id for job in response.jobs)
+
+        jobs, pending = {}, set(job_ids)
+        while pending:
+            await asyncio.sleep(0.05)
+            for job_id in list(pending):
+                job = main.job_queue.get(job_id)
+                if job["status"] in ("done", "failed"):
+                    jobs[job_id] = job
+                    pending.discard(job_id)
+        ingest_seconds = time.perf_counter() - ingest_start
+        job_seconds = [
+            (datetime.fromisoformat(job["updated_at"]) - datetime.fromisoformat(job["created_at"])).total_seconds()
+            for job in jobs.values()
+        ]
+        failed = [job["error"] for job in jobs.values() if job["status"] == "failed"]
+        results["ingest"] = {
+            "seconds": ingest_seconds,
+            "failed": len(failed),
+            "first_error": failed[0] if failed else None,
+            "rss_mb": peak_rss_mb(),
+            "stages": {
+                "upload request": summarize(upload_seconds),
+                **{f"stage: {name}": summarize(values) for name, values in durations.items()},
+                "job (queued to done)": summarize(job_seconds, ingest_seconds),
+            },
+        }
+
+        # Listing: walk the whole catalog with the cursor, with full resumes and with summary fields only
+        listing = {}
+        listing_start = time.perf_counter()
+        for label, fields in (("page (full resumes)", []), ("page (summary fields)", ["full_name", "current_position"])):
+            page_seconds, cursor, phase_start = [], None, time.perf_counter()
+            while True:
+                start = time.perf_counter()
+                page = await main.list_resumes(limit=options["page_size"], offset=0, cursor=cursor, sort="filename",
+                                               order="asc", fields=fields, user_uuid=USER_UUID)
+                page_seconds.append(time.perf_counter() - start)
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+            listing[label] = summarize(page_seconds, time.perf_counter() - phase_start)
+        results["listing"] = {"seconds": time.perf_counter() - listing_start, "rss_mb": peak_rss_mb(), "stages": listing}
+
+        # Questions: a fixed list, `question_concurrency` at a time
+        semaphore = asyncio.Semaphore(options["question_concurrency"])
+        question_seconds, answered_files = [], 0
+
+        async def ask(query):
+            nonlocal answered_files
+            async with semaphore:
+                start = time.perf_counter()
+                response = await main.ask_question(payload=main.QuestionRequest(query=query), user_uuid=USER_UUID)
+                question_seconds.append(time.perf_counter() - start)
+                answered_files += len(response["files"])
+
+        questions = [DEFAULT_QUESTIONS[i % len(DEFAULT_QUESTIONS)] for i in range(options["questions"])]
+        questions_start = time.perf_counter()
+        await asyncio.gather(*(ask(query) for query in questions))
+        questions_seconds = time.perf_counter() - questions_start
+        results["questions"] = {
+            "seconds": questions_seconds,
+            "files_per_answer": answered_files / len(questions) if questions else 0,
+            "rss_mb": peak_rss_mb(),
+            "stages": {"question": summarize(question_seconds, questions_seconds)},
+        }
+    return results
+
+def run_size(files, lines_by_hash, options):
+    """Runs in a child process: starts the API with the stand-ins in an empty data folder and measures one corpus."""
+    sys.path.insert(0, BACKEND_DIR)
+    workdir = tempfile.mkdtemp(prefix="resume-benchmark-")
+    os.chdir(workdir)  #the API keeps its stores in the working directory
+    if options["answer_cache"]:
+        os.environ.setdefault("ANSWER_CACHE_THRESHOLD", "0.95")
+    for key, value in DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("OCR_PROCESSES", str(options["ocr_processes"]))
+
+    import logging
+    if not options["trace_logs"]:
+        logging.getLogger("resume_api.trace").disabled = True
+
+    if options["embeddings"] == "fake":
+        import embeddings
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        embeddings.build_embedding_model = lambda *args, **kwargs: DeterministicFakeEmbedding(size=384)
+
+    from benchmarks.stand_ins import FakeGeminiClient, FakeOCREngine, FakeAgentModel
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    import main
+    import_seconds = time.perf_counter() - start
+
+    if options["ocr"] == "fake":
+        main.get_ocr_engine.set(FakeOCREngine(lines_by_hash, latency_per_page=options["ocr_latency"],
+                                              lines_per_page=LINES_PER_PAGE))
+    resumes = [synthetic_resume(index, options["seed"]) for index in range(len(files))]
+    gemini_client = FakeGeminiClient(resumes, latency=options["gemini_latency"], jitter=options["gemini_latency"] * 0.2,
+                                     seed=options["seed"])
+    main.get_extractor().client = gemini_client
+    main.get_llm.set(FakeAgentModel(latency=options["chat_latency"]))
+    durations = {}
+    main.ingest_stage = recording_stage(main.ingest_stage, durations)
+
+    try:
+        results = asyncio.run(drive(main, files, options, durations))
+    finally:
+        os.chdir(BACKEND_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+    results.update({
+        "size": len(files),
+        "import_seconds": import_seconds,
+        "import_rss_mb": peak_rss_mb() - rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "children_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "gemini_requests": gemini_client.calls,
+    })
+    return results
+
+def _ms(value):
+    return "-" if value is None else f"{value:.1f}"
+
+def render_report(results, options):
+    lines = [
+        f"End-to-end benchmark: OCR `{options['ocr']}`, embeddings `{options['embeddings']}`, Gemini stand-in "
+        f"{options['gemini_latency']}s, chat stand-in {options['chat_latency']}s per call, seed {options['seed']}.",
+        "",
+        "| Corpus | Ingest (docs/s) | Job p95 (ms) | List page p95 (ms) | Questions/s | Question p95 (ms) | Failed jobs | Peak RSS (MB) |",
+        "|--------|-----------------|--------------|--------------------|-------------|-------------------|-------------|---------------|",
+    ]
+    for result in results:
+        job = result["ingest"]["stages"]["job (queued to done)"]
+        page = result["listing"]["stages"]["page (full resumes)"]
+        question = result["questions"]["stages"]["question"]
+        lines.append(
+            f"| {result['size']} | {job['throughput']:.2f} | {_ms(job['p95_ms'])} | {_ms(page['p95_ms'])} "
+            f"| {question['throughput'] or 0:.2f} | {_ms(question['p95_ms'])} | {result['ingest']['failed']} "
+            f"| {result['peak_rss_mb']:.0f} |"
+        )
+    for result in results:
+        lines += [
+            "",
+            f"### {result['size']} resumes",
+            "",
+            f"Import of the API: {result['import_seconds']:.2f}s, {result['import_rss_mb']:.0f} MB. "
+            f"Gemini requests: {result['gemini_requests']}. Files per answer: {result['questions']['files_per_answer']:.1f}.",
+            "",
+            "| Phase | Stage | Count | Throughput (/s) | p50 (ms) | p95 (ms) | p99 (ms) | Peak RSS after phase (MB) |",
+            "|-------|-------|-------|-----------------|----------|----------|----------|---------------------------|",
+        ]
+        for phase in ("ingest", "listing", "questions"):
+            for stage, stats in result[phase]["stages"].items():
+                throughput = "-" if stats["throughput"] is None else f"{stats['throughput']:.2f}"
+                lines.append(
+                    f"| {phase} | {stage} | {stats['count']} | {throughput} | {_ms(stats['p50_ms'])} "
+                    f"| {_ms(stats['p95_ms'])} | {_ms(stats['p99_ms'])} | {result[phase]['rss_mb']:.0f} |"
+                )
+        if result["ingest"]["first_error"]:
+            lines += ["", f"First job error: `{result['ingest']['first_error']}`"]
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20,100", help="Comma separated corpus sizes, each one run in a fresh process")
+    parser.add_argument("--format", choices=["pdf", "png", "mixed"], default="pdf", help="png and mixed need Pillow and pypdfium2")
+    parser.add_argument("--corpus-dir", help="Keep the generated files here, to reuse them across runs")
+    parser.add_argument("--ocr", choices=["fake", "paddle"], default="fake", help="paddle runs the real OCR on the files")
+    parser.add_argument("--embeddings", choices=["fake", "model"], default="fake",
+                        help="model loads the real embedding model (EMBEDDING_BACKEND applies)")
+    parser.add_argument("--ocr-latency", type=float, default=0.5, help="Seconds per page of the OCR stand-in")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="Seconds per request of the Gemini stand-in")
+    parser.add_argument("--chat-latency", type=float, default=0.5, help="Seconds per call of the chat model stand-in")
+    parser.add_argument("--ocr-processes", type=int, default=2, help="OCR_PROCESSES, unless already set in the environment")
+    parser.add_argument("--upload-batch", type=int, default=10, help="Files per upload request")
+    parser.add_argument("--page-size", type=int, default=100, help="limit of each /resumes page")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--question-concurrency", type=int, default=4)
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the answer cache on (off by default)")
+    parser.add_argument("--trace-logs", action="store_true", help="Print the JSON trace logs of the API")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the markdown report to this file instead of stdout")
+    parser.add_argument("--json", help="Also write the raw results to this JSON file, to compare runs")
+    args = parser.parse_args()
+
+    sizes = sorted({int(size) for size in args.sizes.split(",") if size})
+    if not sizes or sizes[0] < 1:
+        parser.error("--sizes must be positive integers")
+    options = {
+        "ocr": args.ocr, "embeddings": args.embeddings, "ocr_latency": args.ocr_latency,
+        "gemini_latency": args.gemini_latency, "chat_latency": args.chat_latency, "ocr_processes": args.ocr_processes,
+        "upload_batch": args.upload_batch, "page_size": args.page_size, "questions": args.questions,
+        "question_concurrency": args.question_concurrency, "answer_cache": args.answer_cache,
+        "trace_logs": args.trace_logs, "seed": args.seed,
+    }
+
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="resume-corpus-")
+    try:
+        files, lines_by_hash = build_corpus(corpus_dir, sizes[-1], args.format, args.seed)
+        results = []
+        for size in sizes:
+            # A fresh process and empty stores per size, so one run does not warm the caches of the next
+            with mp.get_context("spawn").Pool(1) as pool:
+                results.append(pool.apply(run_size, (files[:size], lines_by_hash, options)))
+            print(f"{size} resumes: done", flush=True)
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    report = render_report(results, options)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"options": options, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
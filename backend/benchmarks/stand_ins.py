@@ -0,0 +1,182 @@
+"""
+Local stand-ins for the external services of the pipeline, used by the offline benchmarks.
+
+- `FakeGeminiClient` replaces `genai.Client` in GeminiExtractor and answers the extraction prompts with the
+  structured data of the synthetic resumes, after a configurable latency.
+- `FakeAgentModel` replaces the Gemini chat model of the matching agent: it makes one `retrieve_resumes` call with
+  the question and answers with the files it got back.
+- `FakeOCREngine` replaces OCREngine, returning the text lines of the synthetic resumes without running PaddleOCR.
+
+Everything is deterministic: the same corpus and questions always produce the same outputs.
+"""
+import asyncio, hashlib, json, random, re, time
+from types import SimpleNamespace
+from typing import get_origin
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from content_cache import sha256_file
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Felipe", "Gabriela", "Henrique", "Isabela", "João",
+               "Karina", "Lucas", "Mariana", "Nicolas", "Olivia", "Pedro", "Rafaela", "Samuel", "Tatiana", "Vitor"]
+LAST_NAMES = ["Almeida", "Barbosa", "Costa", "Dias", "Ferreira", "Gomes", "Lima", "Martins", "Nunes", "Oliveira",
+              "Pereira", "Ribeiro", "Santos", "Souza", "Teixeira", "Vieira"]
+POSITIONS = ["Backend Developer", "Frontend Developer", "Data Scientist", "DevOps Engineer", "Machine Learning Engineer",
+             "Full Stack Developer", "Mobile Developer", "QA Engineer", "Data Engineer", "Tech Lead"]
+TECHNICAL_SKILLS = ["Python", "Java", "JavaScript", "TypeScript", "React", "Node.js", "Django", "FastAPI", "AWS",
+                    "GCP", "Azure", "Docker", "Kubernetes", "Terraform", "SQL", "PostgreSQL", "MongoDB", "Spark",
+                    "Pandas", "PyTorch", "TensorFlow", "Go", "C#", "C++", "Kotlin", "Swift", "Redis", "Kafka"]
+SOFT_SKILLS = ["Communication", "Leadership", "Teamwork", "Problem solving", "Mentoring", "Time management"]
+LANGUAGES = ["English (Fluent)", "Portuguese (Native)", "Spanish (Intermediate)", "French (Basic)", "German (Basic)"]
+COMPANIES = ["InovaData", "TechNova", "CloudBR", "FinPay", "Saúde+", "LogiTrack", "EduSmart", "AgroSense"]
+CERTIFICATIONS = ["AWS Certified Solutions Architect", "Certified Kubernetes Administrator", "Google Cloud Professional",
+                  "Scrum Master", "Azure Fundamentals"]
+
+def synthetic_resume(index, seed=0):
+    """Builds the structured data (ResumeData dict) of the synthetic resume number `index`."""
+    rng = random.Random(f"{seed}-{index}")
+    # The index in the name keeps every candidate (and so every output file) distinct
+    full_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}"
+    position = rng.choice(POSITIONS)
+    skills = rng.sample(TECHNICAL_SKILLS, rng.randint(4, 9))
+    experience = []
+    for _ in range(rng.randint(1, 4)):
+        start = rng.randint(2008, 2021)
+        experience.append(
+            f"{rng.choice(POSITIONS)} - {rng.choice(COMPANIES)} ({start}-{start + rng.randint(1, 4)}): "
+            f"Built and maintained services with {', '.join(rng.sample(skills, min(3, len(skills))))}, "
+            f"working with product and design teams."
+        )
+    return {
+        "full_name": full_name,
+        "current_position": position,
+        "email": f"{full_name.lower().replace(' ', '.')}@example.com",
+        "phone": f"+55 11 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        "linkedin": None,
+        "github": None,
+        "address": "São Paulo, SP",
+        "professional_summary": f"{position} with {rng.randint(1, 15)} years of experience in {', '.join(skills[:3])}.",
+        "work_experience": experience,
+        "education": [f"B.Sc. Computer Science - University {rng.randint(1, 30)} ({rng.randint(2000, 2020)})"],
+        "technical_skills": skills,
+        "soft_skills": rng.sample(SOFT_SKILLS, 2),
+        "certifications": rng.sample(CERTIFICATIONS, rng.randint(0, 2)),
+        "projects": [],
+        "languages": rng.sample(LANGUAGES, rng.randint(1, 3)),
+        "achievements": [],
+    }
+
+def resume_lines(resume):
+    """The text lines of a synthetic resume, as they are rendered in its PDF/image."""
+    lines = [resume["full_name"], resume["current_position"], resume["email"], resume["phone"], resume["address"],
+             "SUMMARY", resume["professional_summary"], "EXPERIENCE", *resume["work_experience"],
+             "EDUCATION", *resume["education"], "SKILLS", ", ".join(resume["technical_skills"]),
+             ", ".join(resume["soft_skills"]), "LANGUAGES", ", ".join(resume["languages"])]
+    if resume["certifications"]:
+        lines += ["CERTIFICATIONS", *resume["certifications"]]
+    return lines
+
+
+class FakeGeminiClient:
+    """
+    Stand-in for `genai.Client`, exposing only `client.aio.models.generate_content`.
+
+    It finds the synthetic resumes whose names appear in the prompt, in order, and returns their structured data
+    (a list for the packed prompts, whose schema is a list) after `latency` seconds. Unknown documents get a resume
+    derived from the hash of the prompt.
+    """
+
+    def __init__(self, resumes, latency=1.0, jitter=0.2, seed=0):
+        self.resumes = {resume["full_name"]: resume for resume in resumes}
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        self.calls = 0
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self.generate_content))
+
+    async def generate_content(self, model, contents, config):
+        self.calls += 1
+        digest = int(hashlib.sha256(contents.encode()).hexdigest()[:8], 16)
+        await asyncio.sleep(max(0.0, self.latency + random.Random(digest).uniform(-self.jitter, self.jitter)))
+
+        found = sorted((contents.find(name), resume) for name, resume in self.resumes.items() if name in contents)
+        results = [resume for _, resume in found] or [synthetic_resume(f"unknown-{digest}", self.seed)]
+        is_list = get_origin(config.get("response_schema")) is list
+        text = json.dumps(results if is_list else results[0], ensure_ascii=False)
+        usage = SimpleNamespace(prompt_token_count=len(contents) // 4 + 1, candidates_token_count=len(text) // 4 + 1)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+class FakeOCREngine:
+    """
+    Stand-in for OCREngine: returns the lines of the synthetic resume stored in a file (found by its SHA-256),
+    split in pages of `lines_per_page`, after `latency_per_page` seconds per page.
+    """
+
+    def __init__(self, lines_by_hash, latency_per_page=0.5, lines_per_page=25):
+        self.lines_by_hash = lines_by_hash
+        self.latency_per_page = latency_per_page
+        self.lines_per_page = lines_per_page
+
+    def warm_up(self):
+        return []
+
+    def shutdown(self):
+        pass
+
+    def recognize(self, path, debug_dir=None):
+        lines = self.lines_by_hash.get(sha256_file(path), ["Unreadable document"])
+        pages = [lines[i : i + self.lines_per_page] for i in range(0, len(lines), self.lines_per_page)]
+        time.sleep(self.latency_per_page * len(pages))
+        return pages
+
+
+class FakeAgentModel(BaseChatModel):
+    """
+    Stand-in for the agent's chat model. The first turn calls `retrieve_resumes` with the user question; the next one
+    answers listing the files found. The structured response repeats that answer. Each model call takes `latency`
+    seconds.
+    """
+
+    latency: float = 1.0
+
+    @property
+    def _llm_type(self):
+        return "fake-agent"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def with_structured_output(self, schema, **kwargs):
+        def respond(messages):
+            messages = getattr(messages, "messages", messages)  #a prompt value or a list of messages
+            answer = next((m.content for m in reversed(messages) if isinstance(m, AIMessage) and m.content), "")
+            return schema(answer=answer, files=re.findall(r"Source: (\S+)", answer))
+
+        async def arespond(messages):
+            await asyncio.sleep(self.latency)
+            return respond(messages)
+
+        return RunnableLambda(respond, afunc=arespond)
+
+    def _reply(self, messages):
+        tool_results = [m for m in messages if isinstance(m, ToolMessage)]
+        if not tool_results:
+            question = next((m.content for m in reversed(messages) if m.type == "human"), "")
+            return AIMessage(content="", tool_calls=[
+                {"name": "retrieve_resumes", "args": {"query": question}, "id": f"call-{len(messages)}"}
+            ])
+        sources = list(dict.fromkeys(re.findall(r"Source: (\S+)", tool_results[-1].content)))
+        lines = ["Ranking of the best matching candidates:"] + [
+            f"{i}. Source: {source}" for i, source in enumerate(sources, 1)
+        ]
+        return AIMessage(content="\n".join(lines))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
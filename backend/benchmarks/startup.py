@@ -0,0 +1,123 @@
+"""
+Startup benchmark of the API process (see docs/benchmarks.md).
+
+Measures, each time in a fresh process with empty stores: the time and memory to import `main` (what every uvicorn
+worker pays before serving its first request), the slowest modules of that import (`python -X importtime`), then the
+time and memory to load each lazy component, in the order the startup warm-up loads them.
+
+Usage (from the backend folder):
+    python -m benchmarks.startup --runs 3 --output startup_report.md
+"""
+import argparse, multiprocessing as mp, os, re, shutil, statistics, subprocess, sys, tempfile, time
+
+from benchmarks.embedding_backends import peak_rss_mb
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_ENV = {"GEMINI_API_KEY": "offline-benchmark", "WARM_UP_ON_STARTUP": "False"}
+
+def measure_startup(fake_embeddings, components_to_load):
+    """Runs in a child process: imports main in an empty folder, then loads the components one by one."""
+    sys.path.insert(0, BACKEND_DIR)
+    workdir = tempfile.mkdtemp(prefix="resume-startup-")
+    os.chdir(workdir)
+    os.environ.update(BENCHMARK_ENV)
+    if fake_embeddings:
+        import embeddings
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        embeddings.build_embedding_model = lambda *args, **kwargs: DeterministicFakeEmbedding(size=384)
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    import main
+    result = {"import": (time.perf_counter() - start, peak_rss_mb() - rss_before)}
+
+    import components
+    try:
+        for name in components_to_load:
+            rss_before = peak_rss_mb()
+            start = time.perf_counter()
+            try:
+                components.REGISTRY[name]()
+            except Exception as e:
+                result[name] = (None, None, f"{type(e).__name__}: {e}")
+                continue
+            #dependencies loaded on the way (e.g. embeddings by vector_store) are counted in the first component
+            result[name] = (time.perf_counter() - start, peak_rss_mb() - rss_before, None)
+    finally:
+        components.close_all()
+        os.chdir(BACKEND_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+def slowest_imports(top):
+    """Returns [(cumulative seconds, module)] of the `top` slowest modules imported by main (`python -X importtime`)."""
+    workdir = tempfile.mkdtemp(prefix="resume-startup-")
+    try:
+        env = {**os.environ, **BENCHMARK_ENV, "PYTHONPATH": BACKEND_DIR}
+        output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=workdir, env=env,
+                                capture_output=True, text=True, check=True).stderr
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    imports = []
+    for line in output.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        if match and len(match.group(2)) == 3:  #modules imported by main itself, nested ones are included in them
+            imports.append((int(match.group(1)) / 1e6, match.group(3)))
+    return sorted(imports, reverse=True)[:top]
+
+def render_report(runs, imports, components_to_load, fake_embeddings):
+    lines = [
+        f"Startup of the API process, {len(runs)} runs, embeddings {'fake' if fake_embeddings else 'model'}.",
+        "",
+        "| Step | Median (s) | Min (s) | Max (s) | Added peak RSS (MB) |",
+        "|------|------------|---------|---------|---------------------|",
+    ]
+    for step in ["import", *components_to_load]:
+        errors = [run[step][2] for run in runs if step != "import" and run[step][2]]
+        if errors:
+            lines.append(f"| load {step} | failed: `{errors[0]}` | | | |")
+            continue
+        seconds = [run[step][0] for run in runs]
+        rss = statistics.median(run[step][1] for run in runs)
+        label = "import main" if step == "import" else f"load {step}"
+        lines.append(f"| {label} | {statistics.median(seconds):.2f} | {min(seconds):.2f} | {max(seconds):.2f} | {rss:.0f} |")
+    lines.append(f"| **peak RSS** | | | | {statistics.median(run['peak_rss_mb'] for run in runs):.0f} total |")
+    if imports:
+        lines += ["", "Slowest imports of `main` (cumulative, a module imported by several is counted in the first):", "", "| Module | Seconds |", "|--------|---------|"]
+        lines += [f"| {module} | {seconds:.3f} |" for seconds, module in imports]
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--components", help="Comma separated components to load after the import (default: all but "
+                                             "ocr_engine, which needs PaddleOCR)")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Replace the embedding model, e.g. offline")
+    parser.add_argument("--top-imports", type=int, default=15, help="Slowest imports listed (0 to skip)")
+    parser.add_argument("--output", help="Write the markdown report to this file instead of stdout")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    if args.components:
+        components_to_load = [name for name in args.components.split(",") if name]
+    else:
+        components_to_load = ["embeddings", "vector_store", "hybrid_retriever", "answer_cache", "llm", "agent", "extractor"]
+
+    runs = []
+    for i in range(args.runs):
+        # A fresh process per run, so nothing is imported or loaded already
+        with mp.get_context("spawn").Pool(1) as pool:
+            runs.append(pool.apply(measure_startup, (args.fake_embeddings, components_to_load)))
+        print(f"run {i + 1}: done", flush=True)
+    imports = slowest_imports(args.top_imports) if args.top_imports else []
+
+    report = render_report(runs, imports, components_to_load, args.fake_embeddings)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import json, math, re, sqlite3
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from langchain_core.documents import Document
+
+# Keeps tokens such as "c++", "c#" and "node.js" in one piece
+TOKEN_PATTERN = re.compile(r"[\w+#]+(?:\.[\w+#]+)*")
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_PATTERN.findall(text)]
+
+
+class BM25Index:
+    """
+    Local inverted index with BM25 scoring, stored in a SQLite file.
+
+    It holds the same chunks (and IDs) as the Chroma collection and is updated incrementally at ingest time. It is
+    used for lexical matching of exact tokens like "AWS", "Kubernetes" or a company name, which dense vectors of
+    short queries often miss.
+    """
+
+    def __init__(self, db_path, k1=1.5, b=0.75):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS docs (
+                    id TEXT PRIMARY KEY,
+                    source TEXT,
+                    length INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, doc_id)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings (doc_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_source ON docs (source)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with conn:  #one transaction per call
+                yield conn
+        finally:
+            conn.close()
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def add(self, ids, documents):
+        """Adds (or replaces) chunks, keyed by the same IDs used in the vector store."""
+        with self._connect() as conn:
+            self._delete(conn, ids)
+            for doc_id, doc in zip(ids, documents):
+                terms = Counter(tokenize(doc.page_content))
+                conn.execute(
+                    "INSERT INTO docs (id, source, length, content, metadata) VALUES (?, ?, ?, ?, ?)",
+                    (doc_id, doc.metadata.get("source"), sum(terms.values()), doc.page_content,
+                     json.dumps(doc.metadata, ensure_ascii=False)),
+                )
+                conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, doc_id, tf) for term, tf in terms.items()],
+                )
+
+    def delete(self, ids):
+        with self._connect() as conn:
+            self._delete(conn, ids)
+
+    @staticmethod
+    def _delete(conn, ids):
+        ids = list(ids)
+        for i in range(0, len(ids), 500):
+            part = ids[i : i + 500]
+            marks = ",".join("?" * len(part))
+            conn.execute(f"DELETE FROM postings WHERE doc_id IN ({marks})", part)
+            conn.execute(f"DELETE FROM docs WHERE id IN ({marks})", part)
+
+    def rebuild_from(self, vector_store, page_size=1000):
+        """Fills the index with every chunk already stored in the vector store. Returns the number of chunks."""
+        total, offset = 0, 0
+        while True:
+            page = vector_store.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            if not page["ids"]:
+                return total
+            documents = [
+                Document(page_content=content, metadata=metadata or {})
+                for content, metadata in zip(page["documents"], page["metadatas"])
+            ]
+            self.add(page["ids"], documents)
+            total += len(page["ids"])
+            offset += page_size
+
+    def search(self, query, k=10, sources=None):
+        """
+        Returns up to `k` (Document, score) pairs, best first, scored with BM25 against the query tokens.
+        If `sources` is given, only chunks of those sources are considered.
+        """
+        terms = list(set(tokenize(query)))
+        if not terms or sources is not None and not sources:
+            return []
+        marks = ",".join("?" * len(terms))
+        source_filter, source_params = "", []
+        if sources is not None:
+            source_filter = f" AND d.source IN ({','.join('?' * len(sources))})"
+            source_params = list(sources)
+
+        with self._connect() as conn:
+            total_docs, avg_length = conn.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+            if not total_docs:
+                return []
+            doc_freq = dict(conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({marks}) GROUP BY term", terms
+            ).fetchall())
+            rows = conn.execute(
+                f"SELECT p.term, p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id "
+                f"WHERE p.term IN ({marks}){source_filter}",
+                [*terms, *source_params],
+            ).fetchall()
+
+            scores = defaultdict(float)
+            for term, doc_id, tf, length in rows:
+                idf = math.log(1 + (total_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * length / (avg_length or 1))
+                scores[doc_id] += idf * tf * (self.k1 + 1) / norm
+
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            if not best:
+                return []
+            ids = [doc_id for doc_id, _ in best]
+            docs = {
+                doc_id: Document(id=doc_id, page_content=content, metadata=json.loads(metadata))
+                for doc_id, content, metadata in conn.execute(
+                    f"SELECT id, content, metadata FROM docs WHERE id IN ({','.join('?' * len(ids))})", ids
+                ).fetchall()
+            }
+        return [(docs[doc_id], score) for doc_id, score in best]
@@ -0,0 +1,102 @@
+"""
+Lazily initialized components shared by the whole process (embedding model, vector store, chat model, OCR, ...).
+
+Each component is built by its factory the first time it is used, so a process only pays for what it serves: a
+replica answering `/login` or `/resumes` never loads the embedding model or PaddleOCR. `warm_up()` loads them ahead
+of time, and `status()` reports what is loaded for the `/ready` endpoint.
+"""
+import threading, time
+
+class Component:
+    """
+    A process-wide singleton built by `factory()` on first use. Thread safe: concurrent first calls build it once.
+
+    Calling the component returns the instance. `set()` replaces it (e.g. with a stand-in in the benchmarks).
+
+    Args:
+        name (str): Name reported by `status()`.
+        factory (callable): Builds the instance, without arguments.
+        close (callable, optional): Releases the instance at shutdown (called with it as the only argument).
+    """
+
+    def __init__(self, name, factory, close=None):
+        self.name = name
+        self.factory = factory
+        self._close = close
+        self._lock = threading.Lock()
+        self._instance = None
+        self._loaded = False
+        self.load_seconds = None
+        self.error = None
+
+    def __call__(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    try:
+                        self._instance = self.factory()
+                    except Exception as e:
+                        self.error = f"{type(e).__name__}: {e}"
+                        raise
+                    self.load_seconds = time.perf_counter() - start
+                    self.error = None
+                    self._loaded = True
+        return self._instance
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def set(self, instance):
+        with self._lock:
+            self._instance = instance
+            self._loaded = True
+            self.load_seconds = 0.0
+            self.error = None
+
+    def close(self):
+        """Releases the instance if it was ever built. The next call builds a new one."""
+        with self._lock:
+            if self._loaded and self._close is not None:
+                self._close(self._instance)
+            self._instance = None
+            self._loaded = False
+
+    def status(self):
+        return {
+            "loaded": self._loaded,
+            "load_seconds": round(self.load_seconds, 3) if self._loaded and self.load_seconds is not None else None,
+            "error": self.error,
+        }
+
+REGISTRY = {}
+
+def component(name, close=None):
+    """Decorator turning a factory function into a registered lazy `Component`."""
+    def register(factory):
+        REGISTRY[name] = Component(name, factory, close=close)
+        return REGISTRY[name]
+    return register
+
+def warm_up(names=None):
+    """
+    Loads the given components (every registered one by default), in order. A failing component is recorded in its
+    status and does not stop the others. Returns True if all of them loaded.
+    """
+    ok = True
+    for name in names if names is not None else list(REGISTRY):
+        try:
+            REGISTRY[name]()
+        except Exception:
+            ok = False
+    return ok
+
+def status():
+    return {name: component.status() for name, component in REGISTRY.items()}
+
+def close_all(names=None):
+    """Releases the given loaded components (every registered one by default), in the reverse order of registration."""
+    for name in reversed(list(REGISTRY)):
+        if names is None or name in names:
+            REGISTRY[name].close()
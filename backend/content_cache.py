@@ -0,0 +1,122 @@
+import hashlib, json, sqlite3, time
+from contextlib import contextmanager
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def sha256_texts(texts):
+    """SHA-256 of a list of strings (e.g. the OCR `rec_texts`), independent of how they are split across pages."""
+    return hashlib.sha256(json.dumps(texts, ensure_ascii=False).encode()).hexdigest()
+
+
+class ContentCache:
+    """
+    Content-addressed cache stored in a local SQLite file.
+
+    Entries are grouped in namespaces (e.g. "ocr" keyed by the hash of the uploaded file, "extraction" keyed by the
+    hash of the OCR texts) and hold any JSON serialisable value. Entries older than `max_age_seconds` are dropped,
+    and once there are more than `max_entries` the least recently used ones are evicted.
+
+    Hit/miss counters are kept in the same file, so they cover every process using it (e.g. the API and the ingest
+    workers running apart).
+    """
+
+    def __init__(self, db_path, max_entries=10000, max_age_seconds=30 * 24 * 3600):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON cache (last_used)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS counters (
+                    namespace TEXT PRIMARY KEY,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _count(conn, namespace, hit):
+        conn.execute(
+            "INSERT INTO counters (namespace, hits, misses) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+            (namespace, int(hit), int(not hit)),
+        )
+
+    def get(self, namespace, key):
+        """Returns the cached value, or None on a miss (expired entries count as misses)."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is not None and now - row[1] > self.max_age_seconds:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+                row = None
+            if row is not None:
+                conn.execute(
+                    "UPDATE cache SET last_used = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+                )
+            self._count(conn, namespace, row is not None)
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, namespace, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._evict(conn, now)
+
+    def delete(self, namespace, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.max_age_seconds,))
+        (total,) = conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if total > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY last_used LIMIT ?)",
+                (total - self.max_entries,),
+            )
+
+    def stats(self):
+        """Hit/miss counters of every process per namespace, plus the number of stored entries."""
+        with self._connect() as conn:
+            entries = dict(conn.execute("SELECT namespace, COUNT(*) FROM cache GROUP BY namespace").fetchall())
+            counters = {row[0]: {"hits": row[1], "misses": row[2]}
+                        for row in conn.execute("SELECT namespace, hits, misses FROM counters")}
+        return {
+            namespace: {**counters.get(namespace, {"hits": 0, "misses": 0}), "entries": entries.get(namespace, 0)}
+            for namespace in sorted(set(counters) | set(entries))
+        }
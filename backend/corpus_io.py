@@ -0,0 +1,198 @@
+"""
+Export/import of the processed resume corpus as a single compressed Parquet file.
+
+Each row holds one resume: its file name, ingestion time, every ResumeData field as a typed column and, optionally,
+its chunks with their stored embeddings. Importing such a file on a new node restores the JSON files, the catalog,
+the metadata index, the BM25 index and the vector store without running OCR, Gemini or the embedding model again.
+
+Usage (from the backend folder, with the API stopped, since the Chroma folder is not meant to be shared by two
+processes, unless CHROMA_HOST points to a Chroma server):
+    python -m corpus_io export corpus.parquet [--no-embeddings]
+    python -m corpus_io import corpus.parquet
+    python -m corpus_io reindex  #chunks and embeds the resume JSON files again, e.g. after changing EMBEDDING_BACKEND
+"""
+import argparse, json, os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from langchain_core.documents import Document
+from prompt_schema import ResumeData
+from aux import chunk_resume, upsert_chunks
+
+FORMAT_VERSION = "1"
+RESUME_FIELDS = list(ResumeData.model_fields)
+
+CHUNK_TYPE = pa.struct([
+    ("id", pa.string()),
+    ("content", pa.string()),
+    ("metadata", pa.string()),  #JSON
+    ("embedding", pa.list_(pa.float32())),
+])
+
+def corpus_schema(include_embeddings, embedding_model=None):
+    fields = [("filename", pa.string()), ("ingested_at", pa.string())]
+    for name, field in ResumeData.model_fields.items():
+        fields.append((name, pa.list_(pa.string()) if isinstance(field.default, list) else pa.string()))
+    metadata = {"format_version": FORMAT_VERSION}
+    if include_embeddings:
+        fields.append(("chunks", pa.list_(CHUNK_TYPE)))
+        metadata["embedding_model"] = embedding_model or ""
+    return pa.schema(fields, metadata=metadata)
+
+def _stored_chunks(vector_store, filenames):
+    """Returns {source: [chunk dict]} with the chunks and embeddings stored for the given resume files."""
+    stored = vector_store.get(
+        where={"source": {"$in": filenames}}, include=["documents", "metadatas", "embeddings"]
+    )
+    chunks = {}
+    for chunk_id, content, metadata, embedding in zip(
+        stored["ids"], stored["documents"], stored["metadatas"], stored["embeddings"]
+    ):
+        chunks.setdefault(metadata.get("source"), []).append({
+            "id": chunk_id,
+            "content": content,
+            "metadata": json.dumps(metadata, ensure_ascii=False),
+            "embedding": [float(value) for value in embedding],
+        })
+    return chunks
+
+def export_corpus(path, catalog, vector_store=None, embedding_model=None, batch_size=500, compression="zstd"):
+    """
+    Writes every resume of the catalog to a Parquet file, `batch_size` resumes per row group, so memory stays bounded
+    whatever the corpus size.
+
+    Args:
+        path (str): Parquet file to create.
+        catalog (ResumeCatalog): Source of the resumes.
+        vector_store (Chroma, optional): If given, the chunks of each resume and their embeddings are included.
+        embedding_model (str): Name of the model that produced the embeddings, checked at import time.
+        batch_size (int): Resumes per row group.
+        compression (str): Parquet compression codec.
+
+    Returns:
+        dict: The number of resumes and chunks written.
+    """
+    include_embeddings = vector_store is not None
+    schema = corpus_schema(include_embeddings, embedding_model)
+    total_resumes, total_chunks, cursor = 0, 0, None
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        while True:
+            _, rows, cursor = catalog.page(limit=batch_size, cursor=cursor)
+            if not rows:
+                break
+            records = []
+            for row in rows:
+                record = {"filename": row["filename"], "ingested_at": row["ingested_at"]}
+                record.update({field: row["content"].get(field) for field in RESUME_FIELDS})
+                records.append(record)
+            if include_embeddings:
+                chunks = _stored_chunks(vector_store, [record["filename"] for record in records])
+                for record in records:
+                    record["chunks"] = chunks.get(record["filename"], [])
+                    total_chunks += len(record["chunks"])
+            writer.write_table(pa.Table.from_pylist(records, schema=schema))
+            total_resumes += len(records)
+            if cursor is None:
+                break
+    return {"resumes": total_resumes, "chunks": total_chunks}
+
+def import_corpus(path, output_dir, catalog, metadata_index, vector_store, lexical_index=None, embedding_model=None,
+                  legacy_sources=None, batch_size=500):
+    """
+    Loads a Parquet file written by `export_corpus`, replacing resumes with the same file name.
+
+    Stored chunks are written to the vector store with their embeddings as they are, as long as they were produced by
+    `embedding_model`. Resumes exported without chunks, or with embeddings of another model, are chunked and embedded
+    again locally.
+
+    Args:
+        path (str): Parquet file to read.
+        output_dir (str): Folder of the resume JSON files.
+        catalog (ResumeCatalog), metadata_index (MetadataIndex), vector_store (Chroma), lexical_index (BM25Index):
+            The stores to fill.
+        embedding_model (str): Name of the local embedding model.
+        legacy_sources (callable, optional): Returns the older source names of a file name, whose chunks are replaced.
+        batch_size (int): Resumes read at once.
+
+    Returns:
+        dict: The number of resumes imported, of chunks restored with their embeddings and of resumes whose chunks had
+        to be embedded locally (chunks already stored with the same content and model are kept).
+
+    Raises:
+        ValueError: If the file is not a corpus export, or holds an invalid file name.
+    """
+    parquet_file = pq.ParquetFile(path)
+    metadata = {key.decode(): value.decode() for key, value in (parquet_file.schema_arrow.metadata or {}).items()}
+    if metadata.get("format_version") != FORMAT_VERSION or "filename" not in parquet_file.schema_arrow.names:
+        raise ValueError("Not a resume corpus export")
+    reuse_embeddings = "chunks" in parquet_file.schema_arrow.names and metadata.get("embedding_model") == embedding_model
+
+    stats = {"resumes": 0, "chunks": 0, "reembedded": 0}
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        ids, embeddings, documents, metadatas, stale = [], [], [], [], []
+        for row in batch.to_pylist():
+            filename = row["filename"]
+            if not filename or os.path.basename(filename) != filename or not filename.endswith(".json"):
+                raise ValueError(f"Invalid filename: {filename!r}")
+            resume = {field: row.get(field) for field in RESUME_FIELDS}
+            for field, info in ResumeData.model_fields.items():
+                if isinstance(info.default, list) and resume[field] is None:
+                    resume[field] = []
+
+            with open(os.path.join(output_dir, filename), "w") as json_file:
+                json.dump(resume, json_file, indent=4)
+            catalog.upsert(filename, resume, ingested_at=row["ingested_at"])
+            metadata_index.upsert(filename, resume)
+
+            chunks = row.get("chunks") if reuse_embeddings else None
+            if not chunks:
+                chunk_stats = upsert_chunks(vector_store, filename, chunk_resume(resume, filename),
+                                            legacy_sources=legacy_sources(filename) if legacy_sources else (),
+                                            lexical_index=lexical_index, embedding_model=embedding_model)
+                stats["reembedded"] += bool(chunk_stats["added"] or chunk_stats["reembedded"])
+            else:
+                sources = [filename, *(legacy_sources(filename) if legacy_sources else ())]
+                existing = set(vector_store.get(where={"source": {"$in": sources}}, include=[])["ids"])
+                stale.extend(existing - {chunk["id"] for chunk in chunks})
+                for chunk in chunks:
+                    ids.append(chunk["id"])
+                    embeddings.append(chunk["embedding"])
+                    documents.append(chunk["content"])
+                    metadatas.append({**json.loads(chunk["metadata"]), "embedding_model": embedding_model})
+            stats["resumes"] += 1
+
+        if stale:
+            vector_store.delete(ids=stale)
+        if ids:
+            # Chroma's LangChain wrapper always embeds, so precomputed vectors go straight to the collection
+            vector_store._collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+            stats["chunks"] += len(ids)
+        if lexical_index is not None:
+            lexical_index.delete(stale)
+            if ids:
+                lexical_index.add(ids, [
+                    Document(page_content=content, metadata=chunk_metadata)
+                    for content, chunk_metadata in zip(documents, metadatas)
+                ])
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="write the corpus to a Parquet file")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--no-embeddings", action="store_true", help="only export the structured resumes")
+    import_parser = subparsers.add_parser("import", help="load a Parquet file written by export")
+    import_parser.add_argument("path")
+    subparsers.add_parser("reindex", help="chunk the processed resumes again and re-embed the outdated chunks")
+    args = parser.parse_args()
+
+    import main  #the same stores and embedding model as the API
+
+    if args.command == "export":
+        result = main.export_resume_corpus(args.path, include_embeddings=not args.no_embeddings)
+    elif args.command == "import":
+        result = main.import_resume_corpus(args.path)
+    else:
+        result = main.reindex_resumes()
+    print(json.dumps(result))
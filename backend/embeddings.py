@@ -0,0 +1,179 @@
+import hashlib, sqlite3, threading, time
+from array import array
+from contextlib import contextmanager
+from langchain_core.embeddings import Embeddings
+from metrics import EMBEDDING_TEXTS, EMBEDDING_BATCH_SECONDS
+
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+DEFAULT_ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"  #int8 export shipped with all-MiniLM-L6-v2, runs on any x86-64 CPU
+
+def build_embedding_model(model_name, backend="torch", device="cpu", encode_kwargs=None, onnx_int8_file=DEFAULT_ONNX_INT8_FILE):
+    """
+    Creates the HuggingFaceEmbeddings model running on the chosen backend.
+
+    Backends:
+        torch: full precision PyTorch (the original setup, works on cpu and cuda).
+        torch-int8: PyTorch with the linear layers dynamically quantized to int8 (cpu only).
+        onnx: ONNX Runtime running the ONNX export of the model.
+        onnx-int8: ONNX Runtime running the int8 quantized export given by `onnx_int8_file`.
+    The ONNX backends need `sentence-transformers[onnx]` installed.
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}. Use one of {', '.join(EMBEDDING_BACKENDS)}")
+
+    model_kwargs = {"device": device}
+    if backend in ("onnx", "onnx-int8"):
+        model_kwargs["backend"] = "onnx"
+    if backend == "onnx-int8":
+        model_kwargs["model_kwargs"] = {"file_name": onnx_int8_file}
+
+    model = HuggingFaceEmbeddings(model_name=model_name, model_kwargs=model_kwargs, encode_kwargs=encode_kwargs or {})
+
+    if backend == "torch-int8":
+        import torch
+        model._client = torch.quantization.quantize_dynamic(model._client.to("cpu"), {torch.nn.Linear}, dtype=torch.qint8)
+
+    return model
+
+def cache_model_name(model_name, backend):
+    # Quantized backends give slightly different vectors, so they get their own cache keys
+    return model_name if backend == "torch" else f"{model_name}:{backend}"
+
+
+class _EmbeddingRequest:
+    def __init__(self, texts):
+        self.texts = texts
+        self.vectors = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding layer wrapping a LangChain embedding model with batching and an on-disk cache.
+
+    Vectors are stored in a local SQLite file keyed by the SHA-256 of the model name and the text, so repeated texts
+    (skill lists, boilerplate lines, full reindexes) are never embedded twice. Texts that are not cached are sent to
+    the model in batches of `batch_size`; calls made by different ingest workers within `batch_window` seconds of
+    each other are merged into the same batches.
+
+    Args:
+        embeddings (Embeddings): The model actually computing the vectors (e.g. HuggingFaceEmbeddings).
+        model_name (str): Identifies the model in the cache keys, vectors of different models never mix.
+        cache_path (str): SQLite file used as cache.
+        batch_size (int): Maximum number of texts sent to the model at once.
+        batch_window (float): Seconds the first caller waits for other callers to join its batch.
+    """
+
+    def __init__(self, embeddings, model_name, cache_path, batch_size=64, batch_window=0.05):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._pending = []
+        self._flushing = False
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.cache_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _key(self, kind, text):
+        return hashlib.sha256(f"{self.model_name}\x00{kind}\x00{text}".encode()).hexdigest()
+
+    def _load(self, keys):
+        found = {}
+        keys = list(set(keys))
+        with self._connect() as conn:
+            for i in range(0, len(keys), 500):
+                part = keys[i : i + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def _store(self, items):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in items],
+            )
+
+    def _encode(self, texts):
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            with EMBEDDING_BATCH_SECONDS.time():
+                vectors.extend(self.embeddings.embed_documents(texts[i : i + self.batch_size]))
+        return vectors
+
+    def _embed_batched(self, texts):
+        request = _EmbeddingRequest(texts)
+        with self._lock:
+            self._pending.append(request)
+            leader = not self._flushing
+            self._flushing = True
+
+        if leader:
+            # The first caller waits a little so concurrent callers join the batch, then embeds for all of them
+            time.sleep(self.batch_window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._flushing = False
+            try:
+                vectors = self._encode([text for item in batch for text in item.texts])
+            except Exception as e:
+                for item in batch:
+                    item.error = e
+                    item.done.set()
+            else:
+                start = 0
+                for item in batch:
+                    item.vectors = vectors[start : start + len(item.texts)]
+                    start += len(item.texts)
+                    item.done.set()
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.vectors
+
+    def embed_documents(self, texts):
+        keys = [self._key("document", text) for text in texts]
+        cached = self._load(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        EMBEDDING_TEXTS.labels("hit").inc(len(texts) - len(missing))
+        EMBEDDING_TEXTS.labels("miss").inc(len(missing))
+        if missing:
+            vectors = self._embed_batched(list(missing.values()))
+            new = list(zip(missing.keys(), vectors))
+            self._store(new)
+            cached.update(new)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text):
+        key = self._key("query", text)
+        cached = self._load([key])
+        if key in cached:
+            EMBEDDING_TEXTS.labels("hit").inc()
+            return cached[key]
+        EMBEDDING_TEXTS.labels("miss").inc()
+        vector = self.embeddings.embed_query(text)
+        self._store([(key, vector)])
+        return vector
@@ -0,0 +1,148 @@
+import asyncio, json, random, threading, time
+from google import genai
+from google.genai import errors
+from prompt_schema import ResumeData, RESUME_EXTRACTION_PROMPT, RESUME_BATCH_EXTRACTION_PROMPT
+from rate_limit import TokenBucket, SharedTokenBucket
+from metrics import (
+    GEMINI_REQUESTS, GEMINI_REQUEST_SECONDS, GEMINI_THROTTLE_SECONDS, GEMINI_TOKENS, GEMINI_REQUESTS_IN_PROGRESS
+)
+
+RETRYABLE_STATUS_CODES = (429, 500, 503)
+
+def estimate_tokens(text):
+    # Rough estimate (~4 characters per token), only used to budget the TPM limit
+    return len(text) // 4 + 1
+
+
+class GeminiExtractor:
+    """
+    Shared client that turns OCR texts into structured `ResumeData` with Gemini.
+
+    A single `genai.Client` is reused for every resume and requests are sent through the async API from a dedicated
+    event loop, so the ingest worker threads can call `extract` concurrently. Requests are limited by a semaphore
+    (`max_concurrency`) and by token buckets for the RPM and TPM quotas, and quota/overload errors are retried with
+    exponential backoff. With `quota_db`, the buckets are kept in that SQLite file and shared by every process using
+    it, otherwise each extractor has its own.
+
+    When `pack_max_tokens` is set, resumes whose OCR text is shorter than that are held for up to `pack_window`
+    seconds and sent together (up to `pack_max_items`) in one request returning a list of `ResumeData`.
+    """
+
+    def __init__(self, api_key=None, model="gemini-2.5-flash", client=None, max_concurrency=4, rpm=10,
+                 tpm=250000, max_retries=5, backoff_base=2.0, expected_output_tokens=1024,
+                 pack_max_tokens=0, pack_max_items=4, pack_window=0.5, quota_db=None):
+        self.client = client or genai.Client(api_key=api_key)
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.expected_output_tokens = expected_output_tokens
+        self.pack_max_tokens = pack_max_tokens
+        self.pack_max_items = pack_max_items
+        self.pack_window = pack_window
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        if quota_db:
+            self._rpm = SharedTokenBucket(quota_db, "rpm", rpm)
+            self._tpm = SharedTokenBucket(quota_db, "tpm", tpm)
+        else:
+            self._rpm = TokenBucket(rpm)
+            self._tpm = TokenBucket(tpm)
+        self._pending = []
+        self._flush_handle = None
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="gemini-extractor", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def extract(self, rec_texts):
+        """
+        Blocking call, safe to use from any thread.
+
+        Args:
+            rec_texts (list[str]): The texts recognized by the OCR for one resume.
+        Returns:
+            dict: The extracted resume, following the `ResumeData` schema.
+        """
+        return asyncio.run_coroutine_threadsafe(self.extract_async(rec_texts), self._loop).result()
+
+    async def extract_async(self, rec_texts):
+        prompt = RESUME_EXTRACTION_PROMPT.format(ocr_data=rec_texts)
+        if not self.pack_max_tokens or estimate_tokens(prompt) > self.pack_max_tokens:
+            return await self._extract_one(prompt)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((rec_texts, prompt, future))
+        if len(self._pending) >= self.pack_max_items:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.pack_window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        items, self._pending = self._pending, []
+        if items:
+            asyncio.ensure_future(self._extract_packed(items))
+
+    async def _extract_one(self, prompt):
+        response = await self._generate(prompt, ResumeData)
+        return json.loads(response.text)
+
+    async def _extract_packed(self, items):
+        try:
+            if len(items) == 1:
+                results = [await self._extract_one(items[0][1])]
+            else:
+                documents = "\n\n".join(
+                    f"Document {i}:\n{rec_texts}" for i, (rec_texts, _, _) in enumerate(items, 1)
+                )
+                prompt = RESUME_BATCH_EXTRACTION_PROMPT.format(count=len(items), documents=documents)
+                response = await self._generate(prompt, list[ResumeData])
+                results = json.loads(response.text)
+                if not isinstance(results, list) or len(results) != len(items):
+                    # The model did not keep one object per document, fall back to one request per resume
+                    results = await asyncio.gather(*(self._extract_one(prompt) for _, prompt, _ in items))
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _generate(self, prompt, schema):
+        for attempt in range(self.max_retries + 1):
+            waiting_since = time.perf_counter()
+            await self._rpm.acquire()
+            await self._tpm.acquire(estimate_tokens(prompt) + self.expected_output_tokens)
+            GEMINI_THROTTLE_SECONDS.observe(time.perf_counter() - waiting_since)
+            try:
+                async with self._semaphore:
+                    with GEMINI_REQUESTS_IN_PROGRESS.track_inprogress(), GEMINI_REQUEST_SECONDS.time():
+                        response = await self.client.aio.models.generate_content(
+                            model=self.model,
+                            contents=prompt,
+                            config={
+                                "response_mime_type": "application/json",
+                                "response_schema": schema,
+                            })
+            except errors.APIError as e:
+                if e.code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                    GEMINI_REQUESTS.labels("error").inc()
+                    raise
+                GEMINI_REQUESTS.labels("retried").inc()
+                await asyncio.sleep(self.backoff_base ** attempt + random.uniform(0, 1))
+            else:
+                GEMINI_REQUESTS.labels("ok").inc()
+                usage = getattr(response, "usage_metadata", None)
+                GEMINI_TOKENS.labels("sent").inc(getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt))
+                GEMINI_TOKENS.labels("received").inc(getattr(usage, "candidates_token_count", None) or 0)
+                return response
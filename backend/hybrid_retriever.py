@@ -0,0 +1,53 @@
+from typing import List, Optional
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever fusing dense (Chroma) and lexical (BM25) results with weighted reciprocal rank fusion.
+
+    Each side returns its `fetch_k` best chunks; a chunk at rank r (starting at 1) on a side contributes
+    `weight / (rrf_k + r)` to its fused score. The `k` chunks with the highest fused score are returned, with the score
+    in `metadata["retrieval_score"]`.
+
+    Passing `sources` (e.g. `retriever.invoke(query, sources=[...])`) restricts both searches to the chunks of those
+    resume files.
+    """
+
+    vector_store: object
+    lexical_index: object
+    k: int = 4
+    fetch_k: int = 20
+    vector_weight: float = 1.0
+    lexical_weight: float = 1.0
+    rrf_k: int = 60
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, sources: Optional[List[str]] = None
+    ) -> List[Document]:
+        if sources is not None and not sources:
+            return []
+        vector_filter = {"source": {"$in": list(sources)}} if sources is not None else None
+        vector_hits = self.vector_store.similarity_search(query, k=self.fetch_k, filter=vector_filter)
+        lexical_hits = [doc for doc, _ in self.lexical_index.search(query, k=self.fetch_k, sources=sources)]
+
+        fused = {}
+        for weight, hits in ((self.vector_weight, vector_hits), (self.lexical_weight, lexical_hits)):
+            if not weight:
+                continue
+            for rank, doc in enumerate(hits, 1):
+                # The same chunk coming from both sides is matched by its source and content
+                key = (doc.metadata.get("source"), doc.page_content)
+                score = weight / (self.rrf_k + rank)
+                if key in fused:
+                    fused[key] = (fused[key][0], fused[key][1] + score)
+                else:
+                    fused[key] = (doc, score)
+
+        best = sorted(fused.values(), key=lambda item: item[1], reverse=True)[: self.k]
+        documents = []
+        for doc, score in best:
+            doc = doc.model_copy(update={"metadata": {**doc.metadata, "retrieval_score": score}})
+            documents.append(doc)
+        return documents
@@ -0,0 +1,45 @@
+"""
+Ingestion worker: runs only the upload pipeline (OCR -> Gemini extraction -> chunking and indexing), taking the jobs
+that the API enqueues in the shared job queue (data/jobs.sqlite3).
+
+Running the workers in their own processes lets PaddleOCR and the extraction scale apart from the API replicas, which
+then run with RUN_INGEST_WORKERS=False and only enqueue uploads and serve reads. Every process must share the data
+folder, `tmp`, `resumes_processed` and the vector store (a Chroma server, set with CHROMA_HOST).
+
+The worker's metrics (ingestion stages, OCR pages, Gemini requests, embeddings) are served in the Prometheus format
+on its own port, since they are not visible from the API's `/metrics`.
+
+Usage (from the backend folder):
+    python ingest_worker.py [--metrics-port 9100]
+"""
+import argparse, os, signal, threading
+from prometheus_client import start_http_server
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--metrics-port", type=int, default=int(os.getenv("INGEST_METRICS_PORT", "9100")),
+                        help="Port of the Prometheus metrics (0 disables them)")
+    args = parser.parse_args()
+
+    import main  #the same settings, stores and pipeline as the API
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    # Load the models before claiming jobs, so the first ones do not wait for them
+    main.components.warm_up(main.INGEST_COMPONENTS)
+    main.start_ingest_workers()
+    main.log_event("ingest_worker_started", worker=main.INGEST_WORKER_ID, threads=main.INGEST_WORKERS,
+                   components={name: status for name, status in main.components.status().items()
+                               if name in main.INGEST_COMPONENTS})
+    stop.wait()
+
+    main.log_event("ingest_worker_stopping", worker=main.INGEST_WORKER_ID)
+    stopped = main.stop_ingest_workers()  #waits up to 5s for the jobs being processed, then puts them back in the queue
+    main.close_components(stopped)
+
+if __name__ == "__main__":
+    run()
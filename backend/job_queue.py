@@ -0,0 +1,272 @@
+import json, sqlite3, threading, time, uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+class JobQueue:
+    """
+    Durable job queue backed by a local SQLite file.
+
+    Every uploaded file becomes one row in the `jobs` table. Workers claim the oldest queued job inside an
+    IMMEDIATE transaction, so several threads (or processes sharing the same file) never pick the same job. Each job
+    records the ID of the worker process running it, so a restarted worker only takes back its own jobs.
+
+    A running job is leased: its worker refreshes `updated_at` while processing it (see `heartbeat`), and a job not
+    refreshed for `lease_seconds` is claimed again by any worker, so the jobs of a worker that was killed or scaled
+    down are not left running forever.
+    """
+
+    def __init__(self, db_path, lease_seconds=300):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    batch_id TEXT NOT NULL,
+                    user_uuid TEXT,
+                    filename TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    content_type TEXT,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch_id)")
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "worker" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")  #queues created before the worker IDs
+            if "content_hash" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN content_hash TEXT")  #SHA-256 of the file, computed on upload
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _now():
+        return datetime.now(timezone.utc).isoformat()
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(self, batch_id, filename, path, content_type=None, user_uuid=None, content_hash=None):
+        """Adds a new job in the `queued` state and returns it. `content_hash` is the SHA-256 of the file, if known."""
+        job_id = str(uuid.uuid4())
+        now = self._now()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, batch_id, user_uuid, filename, path, content_type, content_hash, status, created_at, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, batch_id, user_uuid, filename, path, content_type, content_hash, now, now),
+            )
+        return self.get(job_id)
+
+    def claim(self, worker=None):
+        """
+        Atomically moves the oldest queued job to `running`, owned by `worker`, and returns it, or None if the queue is
+        empty. Running jobs whose lease expired count as queued.
+        """
+        expired = (datetime.now(timezone.utc) - timedelta(seconds=self.lease_seconds)).isoformat()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND updated_at < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (expired,),
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (worker, self._now(), row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def heartbeat(self, job_ids, worker=None):
+        """Renews the lease of the running jobs that `worker` still owns."""
+        if not job_ids:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running' AND worker IS ?",
+                [(self._now(), job_id, worker) for job_id in job_ids],
+            )
+
+    def set_stage(self, job_id, stage):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?", (stage, self._now(), job_id))
+
+    # complete and fail only apply while `worker` still owns the job: once requeued (shutdown) or taken back by another
+    # worker (expired lease), its outcome belongs to the next run. They return whether the job was updated.
+    def complete(self, job_id, result, worker=None):
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'done', stage = NULL, result = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND worker IS ?",
+                (json.dumps(result), self._now(), job_id, worker),
+            ).rowcount > 0
+
+    def fail(self, job_id, error, worker=None):
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ? AND status = 'running' AND worker IS ?",
+                (error, self._now(), job_id, worker),
+            ).rowcount > 0
+
+    def requeue_running(self, worker=None, count_attempt=True):
+        """
+        Puts jobs left in `running` by a crashed or restarted process back in the queue.
+
+        With `worker`, only the jobs of that worker (and the ones claimed before worker IDs existed) are requeued, so
+        a restarting worker does not steal the jobs other workers are running. With `count_attempt=False` (a clean
+        shutdown, not the job's fault), the interrupted run does not count towards the job's attempts.
+        """
+        attempts = "attempts" if count_attempt else "MAX(attempts - 1, 0)"
+        query = f"UPDATE jobs SET status = 'queued', stage = NULL, attempts = {attempts}, updated_at = ? WHERE status = 'running'"
+        params = [self._now()]
+        if worker is not None:
+            query += " AND (worker = ? OR worker IS NULL)"
+            params.append(worker)
+        with self._connect() as conn:
+            return conn.execute(query, params).rowcount
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def count_by_status(self):
+        """Returns {status: number of jobs} for every status in JOB_STATUSES."""
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+    def list(self, status=None, batch_id=None, limit=100, offset=0):
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if batch_id is not None:
+            clauses.append("batch_id = ?")
+            params.append(batch_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs {where} ORDER BY created_at LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+
+class WorkerPool:
+    """
+    Pool of background threads that drain a JobQueue.
+
+    `handler(job)` does the actual processing and returns a JSON serialisable result. Any exception marks the job
+    as failed with the error message, so one bad file never stops the pool. A heartbeat thread renews the lease of the
+    jobs being processed every third of the queue's `lease_seconds`.
+
+    `on_finished(job)`, if given, runs once the pool recorded the outcome of a job it still owned (e.g. to remove its
+    input file). Jobs interrupted by `stop` are neither failed nor finished: they stay for the next run.
+
+    A job claimed more than `max_attempts` times (its previous runs were interrupted by a crash or an expired lease,
+    e.g. a file that gets its worker killed) is failed without running it again.
+    """
+
+    def __init__(self, queue, handler, num_workers=2, poll_interval=1.0, worker_id=None, on_finished=None,
+                 max_attempts=None):
+        self.queue = queue
+        self.handler = handler
+        self.on_finished = on_finished
+        self.max_attempts = max_attempts
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id
+        self._stop = threading.Event()
+        self._threads = []
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        self._stop.clear()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._work, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="ingest-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """
+        Stops the workers, waiting up to `timeout` seconds in total for the jobs being processed. Returns False if some
+        worker was still processing a job by then.
+        """
+        self._stop.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        stopped = not any(thread.is_alive() for thread in self._threads)
+        self._threads = []
+        return stopped
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            with self._running_lock:
+                job_ids = list(self._running)
+            try:
+                self.queue.heartbeat(job_ids, worker=self.worker_id)
+            except sqlite3.Error:
+                pass  #retried on the next beat, well before the lease expires
+
+    def _work(self):
+        while not self._stop.is_set():
+            job = self.queue.claim(worker=self.worker_id)
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            if self.max_attempts is not None and job["attempts"] > self.max_attempts:
+                error = f"Gave up after {self.max_attempts} attempts: the worker processing it stopped or crashed every time"
+                if self.queue.fail(job["id"], error, worker=self.worker_id) and self.on_finished is not None:
+                    self.on_finished(job)
+                continue
+            with self._running_lock:
+                self._running.add(job["id"])
+            try:
+                result = self.handler(job)
+            except Exception as e:
+                # After stop, errors come from the shutdown itself (e.g. the OCR pool cancelling its tasks)
+                finished = not self._stop.is_set() and self.queue.fail(
+                    job["id"], f"{type(e).__name__}: {e}", worker=self.worker_id)
+            else:
+                finished = self.queue.complete(job["id"], result, worker=self.worker_id)
+            finally:
+                with self._running_lock:
+                    self._running.discard(job["id"])
+            if finished and self.on_finished is not None:
+                self.on_finished(job)
@@ -1,74 +1,542 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Header, Depends, Query
+from fastapi import FastAPI, HTTPException, UploadFile, File, Header, Depends, Query, Request
 from pydantic import BaseModel, Field
-from fastapi.responses import FileResponse
-import uuid, re, json, os, bcrypt, tempfile, aiofiles
-from typing import List
-from paddleocr import PaddleOCR
-from prompt_schema import ResumeData, RESUME_EXTRACTION_PROMPT, RESUME_MATCHING_AGENT_PROMPT
-from google import genai
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_chroma import Chroma
-from langgraph.prebuilt import create_react_agent
-from langchain_huggingface import HuggingFaceEmbeddings
-from tinydb import TinyDB
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from starlette.background import BackgroundTask
+import uuid, re, json, os, bcrypt, tempfile, aiofiles, asyncio, math, time, threading, socket, ipaddress
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from contextlib import asynccontextmanager
+from pathlib import Path
+from ocr_engine import OCREngine
+from prompt_schema import RESUME_MATCHING_AGENT_PROMPT, ResumeData
 from datetime import datetime, timezone
-from tool import RetrieveResumesTool
+from job_queue import JobQueue, WorkerPool, JOB_STATUSES
+from rate_limit import SlidingWindowLimiter
+from content_cache import ContentCache, sha256_file, sha256_texts
+from upload_stream import UploadError, receive_uploads
+from bm25 import BM25Index
+from metadata_index import MetadataIndex
+from resume_catalog import ResumeCatalog, SORT_COLUMNS
+from user_store import UserStore
+from audit_log import AuditLog
+from answer_cache import AnswerCache
+from corpus_io import export_corpus, import_corpus
+from embeddings import CachedEmbeddings, build_embedding_model, cache_model_name, DEFAULT_ONNX_INT8_FILE
+import components
+from components import component
 import ast
-
-db = TinyDB('question_logs.json')
+import pyarrow as pa
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from metrics import (
+    HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_PROGRESS, INGEST_JOBS, INGEST_JOBS_IN_PROGRESS, JOB_QUEUE_JOBS, OCR_PAGES,
+    QUESTION_SECONDS, QUESTION_TOOL_CALLS, QUESTIONS_IN_PROGRESS, request_id_var, log_event, ingest_stage
+)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 USE_CUDA = ast.literal_eval(os.getenv("USE_CUDA", "False"))
+DATA_DIR = os.getenv("DATA_DIR", "data") #folder for the local SQLite stores (job queue, etc.)
+OCR_PROCESSES = int(os.getenv("OCR_PROCESSES", "0")) or os.cpu_count() #number of PaddleOCR worker processes
+#number of background threads draining the upload queue, by default enough to keep every OCR process busy
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0")) or max(2, OCR_PROCESSES)
+RUN_INGEST_WORKERS = ast.literal_eval(os.getenv("RUN_INGEST_WORKERS", "True")) #False for API-only replicas, the uploads are then processed by ingest_worker.py
+INGEST_WORKER_ID = os.getenv("INGEST_WORKER_ID", socket.gethostname()) #owner of the jobs this process claims, must be unique per worker process
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3")) #runs of a job interrupted by a crash or an expired lease before it is failed
+INGEST_JOB_LEASE_SECONDS = float(os.getenv("INGEST_JOB_LEASE_SECONDS", "300")) #a running job not renewed for this long is taken back by any worker
+CHROMA_HOST = os.getenv("CHROMA_HOST") #Chroma server shared by the API and the ingest workers (local folder if unset)
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+OCR_DEBUG = ast.literal_eval(os.getenv("OCR_DEBUG", "False")) #when True the raw OCR output of each job is kept as JSON
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")) #simultaneous extraction requests
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "10")) #free tier limits, see docs/choices.md
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "250000"))
+GEMINI_PACK_MAX_TOKENS = int(os.getenv("GEMINI_PACK_MAX_TOKENS", "0")) #resumes shorter than this are packed in one request (0 disables)
+GEMINI_PACK_MAX_ITEMS = int(os.getenv("GEMINI_PACK_MAX_ITEMS", "4"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12")) #bcrypt cost factor for new password hashes
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2")) #threads dedicated to bcrypt
+AUTH_RATE_LIMIT_PER_USER = int(os.getenv("AUTH_RATE_LIMIT_PER_USER", "10")) #register/login/change-password attempts per window
+AUTH_RATE_LIMIT_PER_IP = int(os.getenv("AUTH_RATE_LIMIT_PER_IP", "60"))
+AUTH_RATE_LIMIT_WINDOW = float(os.getenv("AUTH_RATE_LIMIT_WINDOW", "60")) #seconds
+#IPs, networks or hostnames (e.g. the frontend container) whose X-Forwarded-For header gives the client IP for the rate limit
+TRUSTED_PROXIES = [entry.strip() for entry in os.getenv("TRUSTED_PROXIES", "").split(",") if entry.strip()]
+ADMIN_USERS = {name.strip() for name in os.getenv("ADMIN_USERS", "").split(",") if name.strip()} #usernames allowed to use the /admin endpoints
+AUDIT_LOG_MAX_MB = float(os.getenv("AUDIT_LOG_MAX_MB", "50")) #size of the question log file that triggers a rotation
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "1.0")) #seconds a log record may wait in memory
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")) #similarity for a question to reuse a previous answer (0 disables)
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_HOURS = float(os.getenv("ANSWER_CACHE_TTL_HOURS", "24"))
+QUESTION_MAX_CONCURRENCY = int(os.getenv("QUESTION_MAX_CONCURRENCY", "4")) #questions answered by the agent at the same time
+QUESTION_TIMEOUT = float(os.getenv("QUESTION_TIMEOUT", "120")) #seconds, including the wait for a free slot
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60")) #seconds an authenticated token stays cached in memory
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000")) #OCR and extraction results kept for re-uploaded files
+CACHE_MAX_AGE_DAYS = float(os.getenv("CACHE_MAX_AGE_DAYS", "30"))
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch") #torch, torch-int8, onnx or onnx-int8, see docs/embedding_backends.md
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", DEFAULT_ONNX_INT8_FILE)
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "30")) #chunks fetched by each retrieve_resumes call, then grouped by candidate
+RETRIEVER_MAX_CANDIDATES = int(os.getenv("RETRIEVER_MAX_CANDIDATES", "5")) #distinct candidates returned by each retrieve_resumes call
+RETRIEVER_TOKEN_BUDGET = int(os.getenv("RETRIEVER_TOKEN_BUDGET", "1500")) #approximate tokens of each retrieve_resumes output
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0")) #weights of each side in the rank fusion
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64")) #texts sent to the embedding model at once
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) #CPU threads used by the embedding model (0 keeps torch's default)
+WARM_UP_ON_STARTUP = ast.literal_eval(os.getenv("WARM_UP_ON_STARTUP", "True")) #load the models in the background at startup instead of on first use
+UPLOAD_MAX_FILE_MB = float(os.getenv("UPLOAD_MAX_FILE_MB", "20")) #larger files are rejected with 413 while they are received
+UPLOAD_MAX_REQUEST_MB = float(os.getenv("UPLOAD_MAX_REQUEST_MB", "200")) #limit of all the files of one /upload request
+UPLOAD_CHUNK_SIZE_KB = int(os.getenv("UPLOAD_CHUNK_SIZE_KB", "1024")) #bytes buffered per file before each write to disk
 
 print("GEMINI_API_KEY: ", GEMINI_API_KEY)
 print("USE_CUDA: ", USE_CUDA)
+print("OCR_PROCESSES: ", OCR_PROCESSES)
+print("INGEST_WORKERS: ", INGEST_WORKERS)
+print("RUN_INGEST_WORKERS: ", RUN_INGEST_WORKERS)
+print("CHROMA_HOST: ", CHROMA_HOST)
+print("EMBEDDING_BACKEND: ", EMBEDDING_BACKEND)
+print("WARM_UP_ON_STARTUP: ", WARM_UP_ON_STARTUP)
 
-model_name = "sentence-transformers/all-MiniLM-L6-v2"
-model_kwargs = {'device': 'cuda' if USE_CUDA else 'cpu'}
-
-encode_kwargs = {'normalize_embeddings': False}
-embeddings = HuggingFaceEmbeddings(
-    model_name=model_name,
-    model_kwargs=model_kwargs,
-    encode_kwargs=encode_kwargs
-)
-
-from aux import load_json_with_jsonloader, chunk_documents
-
-llm  = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=GEMINI_API_KEY)
-
-vector_store = Chroma(
-    collection_name="rag_collection",
-    embedding_function=embeddings,
-    persist_directory="./chroma_langchain_db",
-)
-
-ocr = PaddleOCR(
-    use_doc_orientation_classify=False,
-    use_doc_unwarping=False,
-    use_textline_orientation=False)
-
-app = FastAPI()
-USER_FILE = "users.json"
+TMP_DIR = "tmp"
+OUTPUT_DIR = "resumes_processed" #folder where the resumes structured output will be saved.
+OCR_DEBUG_DIR = os.path.join(TMP_DIR, "ocr_debug")
 
-# Ensure file exists
-if not os.path.exists(USER_FILE):
-    with open(USER_FILE, "w") as f:
-        json.dump({}, f)
+os.makedirs(DATA_DIR, exist_ok=True)
 
-def load_users():
-    with open(USER_FILE) as f:
-        return json.load(f)
-
-def save_users(users):
-    with open(USER_FILE, "w") as f:
-        json.dump(users, f, indent=2)
+model_name = "sentence-transformers/all-MiniLM-L6-v2"
+encode_kwargs = {'normalize_embeddings': False, 'batch_size': EMBEDDING_BATCH_SIZE}
+
+from aux import chunk_resume, upsert_chunks, delete_chunks, CHUNKING_VERSION
+
+bm25_index = BM25Index(os.path.join(DATA_DIR, "bm25.sqlite3"))
+metadata_index = MetadataIndex(os.path.join(DATA_DIR, "metadata.sqlite3"))
+resume_catalog = ResumeCatalog(os.path.join(DATA_DIR, "catalog.sqlite3"))
+job_queue = JobQueue(os.path.join(DATA_DIR, "jobs.sqlite3"), lease_seconds=INGEST_JOB_LEASE_SECONDS)
+content_cache = ContentCache(
+    os.path.join(DATA_DIR, "content_cache.sqlite3"),
+    max_entries=CACHE_MAX_ENTRIES,
+    max_age_seconds=CACHE_MAX_AGE_DAYS * 24 * 3600)
+
+# The models and the stores that need them are built on first use (see components.py), so the process starts
+# without them. Call them to get the shared instance, e.g. `get_vector_store()`.
+
+@component("embeddings")
+def get_embeddings():
+    if EMBEDDING_THREADS:
+        import torch
+        torch.set_num_threads(EMBEDDING_THREADS)
+    return CachedEmbeddings(
+        build_embedding_model(
+            model_name,
+            backend=EMBEDDING_BACKEND,
+            device='cuda' if USE_CUDA else 'cpu',
+            encode_kwargs=encode_kwargs,
+            onnx_int8_file=EMBEDDING_ONNX_FILE
+        ),
+        model_name=cache_model_name(model_name, EMBEDDING_BACKEND),
+        cache_path=os.path.join(DATA_DIR, "embedding_cache.sqlite3"),
+        batch_size=EMBEDDING_BATCH_SIZE)
+
+@component("vector_store")
+def get_vector_store():
+    from langchain_chroma import Chroma
+    if CHROMA_HOST:
+        # A Chroma server, so separate API and ingest worker processes can share the collection
+        import chromadb
+        vector_store = Chroma(
+            collection_name="rag_collection",
+            embedding_function=get_embeddings(),
+            client=chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT),
+        )
+    else:
+        vector_store = Chroma(
+            collection_name="rag_collection",
+            embedding_function=get_embeddings(),
+            persist_directory="./chroma_langchain_db",
+        )
+    if bm25_index.count() == 0:
+        bm25_index.rebuild_from(vector_store) #first start with a collection indexed before the BM25 index existed
+    return vector_store
+
+@component("hybrid_retriever")
+def get_hybrid_retriever():
+    from hybrid_retriever import HybridRetriever
+    return HybridRetriever(
+        vector_store=get_vector_store(),
+        lexical_index=bm25_index,
+        k=RETRIEVER_K,
+        fetch_k=max(20, RETRIEVER_K),
+        vector_weight=HYBRID_VECTOR_WEIGHT,
+        lexical_weight=HYBRID_LEXICAL_WEIGHT)
+
+@component("answer_cache")
+def get_answer_cache():
+    return AnswerCache(
+        os.path.join(DATA_DIR, "answer_cache.sqlite3"),
+        get_embeddings(),
+        threshold=ANSWER_CACHE_THRESHOLD,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES,
+        max_age_seconds=ANSWER_CACHE_TTL_HOURS * 3600)
+
+@component("llm")
+def get_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=GEMINI_API_KEY)
+
+@component("agent")
+def get_agent():
+    return build_agent(get_llm())
+
+@component("extractor", close=lambda extractor: extractor.close())
+def get_extractor():
+    from extraction import GeminiExtractor
+    return GeminiExtractor(
+        api_key=GEMINI_API_KEY,
+        max_concurrency=GEMINI_MAX_CONCURRENCY,
+        rpm=GEMINI_RPM,
+        tpm=GEMINI_TPM,
+        pack_max_tokens=GEMINI_PACK_MAX_TOKENS,
+        pack_max_items=GEMINI_PACK_MAX_ITEMS,
+        quota_db=os.path.join(DATA_DIR, "gemini_quota.sqlite3")) #shared by every process on the data volume
+
+@component("ocr_engine", close=lambda ocr_engine: ocr_engine.shutdown())
+def get_ocr_engine():
+    ocr_engine = OCREngine(
+        num_workers=OCR_PROCESSES,
+        use_doc_orientation_classify=False,
+        use_doc_unwarping=False,
+        use_textline_orientation=False)
+    try:
+        ocr_engine.warm_up() #starts every worker process and loads its OCR model
+    except Exception:
+        ocr_engine.shutdown()
+        raise
+    return ocr_engine
+
+# Components used to serve the API requests, and the ones the ingestion pipeline needs
+API_COMPONENTS = ["embeddings", "vector_store", "hybrid_retriever", "answer_cache", "llm", "agent"]
+INGEST_COMPONENTS = ["embeddings", "vector_store", "answer_cache", "extractor", "ocr_engine"]
+
+def served_components():
+    """The components this process warms up and reports in /ready, according to its role."""
+    names = API_COMPONENTS + (INGEST_COMPONENTS if RUN_INGEST_WORKERS else [])
+    return list(dict.fromkeys(names))
+
+def legacy_sources(filename):
+    # Chunks indexed before the deterministic IDs used the absolute path given by LangChain's JSONLoader as source
+    return [str(Path(OUTPUT_DIR, filename).resolve())]
+
+def process_resume_job(job):
+    """
+    Runs the full ingestion pipeline for a single uploaded file. Executed by the background WorkerPool.
 
-def hash_password(password):
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    Args:
+        job (dict): The job claimed from the queue, holding the path of the uploaded file.
+    Returns:
+        dict: The path of the structured JSON created for the resume.
+    Workflow:
+        1. Runs OCR on the file, keeping the recognized texts in memory. Files already seen (same SHA-256) reuse the cached OCR output.
+        2. Joins the recognized texts of every page, in page order. If the same texts were already extracted and indexed, stops here.
+        3. Uses a language model to generate structured resume data from the OCR text, unless the same texts were already extracted (e.g. a deleted resume uploaded again).
+        4. Saves structured data as a JSON file with a sanitized filename.
+        5. Splits the resume into one chunk per field entry (summary, each experience, skills, ...) and upserts the chunks in the vector store, removing the ones left from a previous version of the same file.
+        6. Updates the skills/languages/certifications metadata index used for pre-filtering and the resume catalog used by `/resumes`.
+    """
+    job_queue.set_stage(job["id"], "ocr")
+    with ingest_stage("ocr", job["id"]):
+        file_hash = job.get("content_hash") or sha256_file(job["path"]) #hashed while uploaded, except for older jobs
+        pages = content_cache.get("ocr", file_hash)
+        if pages is None:
+            debug_dir = os.path.join(OCR_DEBUG_DIR, job["id"]) if OCR_DEBUG else None
+            pages = get_ocr_engine().recognize(job["path"], debug_dir=debug_dir)
+            content_cache.set("ocr", file_hash, pages)
+            OCR_PAGES.inc(len(pages))
+    rec_texts = [text for page in pages for text in page]  #textos extraídos do OCR de todas as páginas, o que vamos usar para obter o structured output
+
+    # Same OCR text as an already processed resume: if its JSON is still there untouched, it is already indexed too
+    text_hash = sha256_texts(rec_texts)
+    cached = content_cache.get("extraction", text_hash)
+    if cached is not None and os.path.exists(cached["json_file"]):
+        with open(cached["json_file"]) as json_file:
+            if json.load(json_file) == cached["resume"]:
+                return {"json_file": cached["json_file"], "cached": True}
+
+    if cached is not None:
+        res = cached["resume"] #JSON deleted or overwritten since: only written and indexed again, without calling Gemini
+    else:
+        job_queue.set_stage(job["id"], "extracting")
+        with ingest_stage("extracting", job["id"]):
+            res = get_extractor().extract(rec_texts)
+
+    if res["full_name"] is not None:
+        # Convert to lowercase
+        file_name = res["full_name"].lower()
+        # Remove spaces
+        file_name = file_name.replace(" ", "")
+        # Remove special characters using regex (keeps only alphanumeric characters)
+        file_name = re.sub(r'[^a-z0-9]', '', file_name)
+    else:
+        file_name = str(uuid.uuid4())
+
+    path_file = f"{OUTPUT_DIR}/{file_name}.json"
+
+    with ingest_stage("json_write", job["id"]), open(path_file, "w") as json_file:
+        json.dump(res,json_file,indent=4)
+
+    job_queue.set_stage(job["id"], "indexing")
+    filename = os.path.basename(path_file)
+    with ingest_stage("chunking", job["id"]):
+        doc_chunks = chunk_resume(res, filename)
+    with ingest_stage("indexing", job["id"]):
+        chunk_stats = upsert_chunks(get_vector_store(), filename, doc_chunks, legacy_sources=legacy_sources(filename), lexical_index=bm25_index,
+                                    embedding_model=get_embeddings().model_name)
+        metadata_index.upsert(filename, res)
+        resume_catalog.upsert(filename, res)
+        get_answer_cache().bump_corpus_version()
+    log_event("chunks_indexed", request_id=job["id"], file=filename, **chunk_stats)
+
+    content_cache.set("extraction", text_hash, {"resume": res, "json_file": path_file})
+
+    return {"json_file": path_file, "cached": False}
+
+def export_resume_corpus(path, include_embeddings=True):
+    """Writes the processed resumes (and optionally their chunks and embeddings) to a Parquet file. See corpus_io.py."""
+    if resume_catalog.count() == 0 and os.path.isdir(OUTPUT_DIR):
+        resume_catalog.rebuild_from_dir(OUTPUT_DIR)
+    return export_corpus(
+        path,
+        resume_catalog,
+        vector_store=get_vector_store() if include_embeddings else None,
+        embedding_model=get_embeddings().model_name)
+
+def import_resume_corpus(path):
+    """Loads a Parquet file written by `export_resume_corpus` into every store. See corpus_io.py."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    try:
+        return import_corpus(
+            path,
+            OUTPUT_DIR,
+            resume_catalog,
+            metadata_index,
+            get_vector_store(),
+            lexical_index=bm25_index,
+            embedding_model=get_embeddings().model_name,
+            legacy_sources=legacy_sources)
+    finally:
+        get_answer_cache().bump_corpus_version()
+
+INDEX_STATE_FILE = os.path.join(DATA_DIR, "index_state.json") #what the stored chunks were last fully indexed with
+
+def reindex_resumes():
+    """
+    Chunks every processed resume of OUTPUT_DIR again and upserts the chunks, with no OCR or Gemini call. Unchanged
+    chunks embedded by the current model are kept, the others are embedded again and the leftovers are deleted.
+    """
+    vector_store, embedding_model = get_vector_store(), get_embeddings().model_name
+    stats = {"resumes": 0, "added": 0, "removed": 0, "kept": 0, "reembedded": 0}
+    for path in sorted(Path(OUTPUT_DIR).glob("*.json")):
+        try:
+            with open(path) as json_file:
+                resume = json.load(json_file)
+        except (OSError, ValueError) as e:
+            log_event("reindex_skipped", file=path.name, error=f"{type(e).__name__}: {e}")
+            continue
+        chunk_stats = upsert_chunks(vector_store, path.name, chunk_resume(resume, path.name),
+                                    legacy_sources=legacy_sources(path.name), lexical_index=bm25_index,
+                                    embedding_model=embedding_model)
+        stats["resumes"] += 1
+        for key, value in chunk_stats.items():
+            stats[key] += value
+    get_answer_cache().bump_corpus_version()
+    return stats
+
+def reindex_if_outdated():
+    """
+    Runs `reindex_resumes` once after the chunking (CHUNKING_VERSION) or the embedding model (EMBEDDING_BACKEND)
+    changed, or when no state was recorded yet (indexes built before either existed), then records the new state.
+    """
+    state = {"chunking": CHUNKING_VERSION, "embedding_model": cache_model_name(model_name, EMBEDDING_BACKEND)}
+    try:
+        with open(INDEX_STATE_FILE) as state_file:
+            previous = json.load(state_file)
+    except (OSError, ValueError):
+        previous = None
+    if previous == state:
+        return
+    log_event("reindex_started", previous=previous, current=state)
+    try:
+        stats = reindex_resumes()
+    except Exception as e:
+        log_event("reindex_failed", error=f"{type(e).__name__}: {e}") #retried on the next start
+        return
+    with open(INDEX_STATE_FILE, "w") as state_file:
+        json.dump(state, state_file)
+    log_event("reindex_done", **stats)
+
+def run_resume_job(job):
+    """Runs `process_resume_job`, recording the job result in the metrics and trace logs."""
+    log_event("ingest_job_started", request_id=job["id"], batch_id=job["batch_id"], filename=job["filename"])
+    start = time.perf_counter()
+    with INGEST_JOBS_IN_PROGRESS.track_inprogress():
+        try:
+            result = process_resume_job(job)
+        except Exception as e:
+            INGEST_JOBS.labels("failed").inc()
+            log_event("ingest_job_failed", request_id=job["id"], error=f"{type(e).__name__}: {e}",
+                      seconds=round(time.perf_counter() - start, 4))
+            raise
+    INGEST_JOBS.labels("cached" if result["cached"] else "done").inc()
+    log_event("ingest_job_done", request_id=job["id"], cached=result["cached"], json_file=result["json_file"],
+              seconds=round(time.perf_counter() - start, 4))
+    return result
+
+def discard_upload(job):
+    # Only once the job is over: a job requeued or taken back from an interrupted worker runs again from the uploaded file
+    if os.path.exists(job["path"]):
+        os.remove(job["path"])
+
+worker_pool = WorkerPool(job_queue, run_resume_job, num_workers=INGEST_WORKERS, worker_id=INGEST_WORKER_ID,
+                         on_finished=discard_upload, max_attempts=INGEST_MAX_ATTEMPTS)
+
+def start_ingest_workers():
+    """
+    Takes back the jobs this worker was running before a restart and starts draining the upload queue. In the
+    background, re-indexes the processed resumes if the stored chunks are outdated (see `reindex_if_outdated`).
+    """
+    os.makedirs(TMP_DIR, exist_ok=True)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    job_queue.requeue_running(worker=INGEST_WORKER_ID)
+    worker_pool.start()
+    threading.Thread(target=reindex_if_outdated, name="reindex", daemon=True).start()
+
+def stop_ingest_workers():
+    """Stops the workers and puts the jobs they were processing back in the queue. Returns False if some are still running."""
+    stopped = worker_pool.stop(timeout=5)
+    #after 5s in total, jobs still being processed are taken by the other workers, without counting it as a failed attempt
+    job_queue.requeue_running(worker=INGEST_WORKER_ID, count_attempt=False)
+    return stopped
+
+def close_components(ingest_workers_stopped=True):
+    """Releases the loaded components, except the ones used by ingest workers still finishing a (requeued) job."""
+    if ingest_workers_stopped:
+        components.close_all()
+    else:
+        components.close_all([name for name in components.REGISTRY if name not in INGEST_COMPONENTS])
+
+QUESTION_LOG_FILE = "question_logs.json" #legacy TinyDB question log, imported into the audit log on the first start
+audit_log = AuditLog(
+    os.path.join(DATA_DIR, "audit_log"),
+    max_bytes=int(AUDIT_LOG_MAX_MB * 1024 * 1024),
+    flush_interval=AUDIT_LOG_FLUSH_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    os.makedirs(TMP_DIR, exist_ok=True)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    if metadata_index.count() == 0:
+        metadata_index.rebuild_from_dir(OUTPUT_DIR)
+    if resume_catalog.count() == 0:
+        resume_catalog.rebuild_from_dir(OUTPUT_DIR) #first start with resumes processed before the catalog existed
+    audit_log.migrate_from_tinydb(QUESTION_LOG_FILE)
+    audit_log.start()
+    if WARM_UP_ON_STARTUP:
+        # In the background, so requests that need no model (login, /resumes, ...) are served right away; see /ready
+        threading.Thread(target=components.warm_up, args=(served_components(),), name="warm-up", daemon=True).start()
+    if RUN_INGEST_WORKERS:
+        start_ingest_workers() #jobs interrupted by a restart are processed again
+    yield
+    ingest_workers_stopped = stop_ingest_workers() if RUN_INGEST_WORKERS else True
+    audit_log.stop(timeout=5)
+    close_components(ingest_workers_stopped)
+    password_executor.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Gives every request an ID (X-Request-ID, generated if missing), times it and writes one trace log line."""
+    request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        with HTTP_REQUESTS_IN_PROGRESS.track_inprogress():
+            response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        seconds = time.perf_counter() - start
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"  #templates, not raw paths, keep the labels bounded
+        HTTP_REQUEST_SECONDS.labels(request.method, route_path, str(status)).observe(seconds)
+        log_event("request", method=request.method, route=route_path, status=status, seconds=round(seconds, 4))
+        request_id_var.reset(token)
+
+USER_FILE = "users.json" #legacy user file, imported into the user store on the first start
+
+user_store = UserStore(
+    os.path.join(DATA_DIR, "users.sqlite3"),
+    token_cache_ttl=TOKEN_CACHE_TTL,
+    legacy_file=USER_FILE)
+
+#bcrypt is CPU bound (~250ms per call), so it runs in its own small pool instead of FastAPI's default threadpool
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+auth_user_limiter = SlidingWindowLimiter(AUTH_RATE_LIMIT_PER_USER, AUTH_RATE_LIMIT_WINDOW)
+auth_ip_limiter = SlidingWindowLimiter(AUTH_RATE_LIMIT_PER_IP, AUTH_RATE_LIMIT_WINDOW)
+
+async def hash_password(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_executor, lambda: bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode())
+
+async def check_password(password, hashed):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, bcrypt.checkpw, password.encode(), hashed.encode())
+
+proxy_hostnames = {} #hostname -> (expiry, addresses), so a restarted frontend container is resolved again
+
+async def is_trusted_proxy(host):
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    for entry in TRUSTED_PROXIES:
+        try:
+            network = ipaddress.ip_network(entry, strict=False)
+        except ValueError:
+            network = None  #a hostname
+        if network is not None:
+            if address in network:
+                return True
+            continue
+        expiry, addresses = proxy_hostnames.get(entry, (0, set()))
+        if expiry < time.monotonic():
+            try:
+                addresses = set((await asyncio.to_thread(socket.gethostbyname_ex, entry))[2]) #off the event loop
+            except OSError:
+                addresses = set()
+            proxy_hostnames[entry] = (time.monotonic() + 60, addresses)
+        if host in addresses:
+            return True
+    return False
+
+async def client_ip(request: Request):
+    """
+    The address of the client. Behind a trusted proxy (TRUSTED_PROXIES), such as the Streamlit server that makes the
+    requests of every user, it is the last address of X-Forwarded-For that is not itself a trusted proxy.
+    """
+    host = request.client.host if request.client else "unknown"
+    forwarded = [address.strip() for address in request.headers.get("x-forwarded-for", "").split(",") if address.strip()]
+    while forwarded and await is_trusted_proxy(host):
+        host = forwarded.pop()
+    return host
 
-def check_password(password, hashed):
-    return bcrypt.checkpw(password.encode(), hashed.encode())
+async def check_auth_rate_limit(request: Request, username: str):
+    """
+    Raises a 429 error if the username or the client IP made too many authentication attempts in the current window.
+    Runs before any password hashing, so brute-force traffic does not cost CPU.
+    """
+    retry_after = auth_ip_limiter.hit(await client_ip(request)) or auth_user_limiter.hit(username)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))})
 
 #Função usada para verificar se existe algum usuário com o UUID.
 #Ele pode ser fornecido pelo header ou pelo query param, tornando simples a integração com o swagger ui ou outras ferramentas de teste de API.
@@ -81,12 +549,15 @@ def verify_uuid(
     if token is None:
         raise HTTPException(status_code=401, detail="Missing authentication token")
 
-    users = load_users()
-    for username, data in users.items():
-        if data["uuid"] == token:
-            return token
+    if user_store.username_for_token(token) is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication token")
+
+    return token
 
-    raise HTTPException(status_code=401, detail="Invalid authentication token")
+def verify_admin(user_uuid: str = Depends(verify_uuid)):
+    if user_store.username_for_token(user_uuid) not in ADMIN_USERS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user_uuid
 
 class UserRegister(BaseModel):
     username: str
@@ -111,192 +582,254 @@ class QuestionResponse(BaseModel):
 class ResumeMetadata(BaseModel):
     filename: str
     content: dict
+    ingested_at: Optional[str] = None
 
 class ResumePage(BaseModel):
     total: int
     resumes: list[ResumeMetadata]
+    next_cursor: Optional[str] = None
+
+class ResumeSearchResult(BaseModel):
+    total: int
+    files: list[str]
+
+class JobStatus(BaseModel):
+    id: str
+    batch_id: str
+    filename: str
+    status: str
+    stage: Optional[str] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+class UploadResponse(BaseModel):
+    batch_id: str
+    jobs: list[JobStatus]
+
+def build_agent(model):
+    """Builds the resume matching agent. The compiled graph is stateless, so one instance serves every question."""
+    from langgraph.prebuilt import create_react_agent
+    from tool import RetrieveResumesTool
+    retriever_tool = RetrieveResumesTool(
+        retriever=get_hybrid_retriever(),
+        metadata_index=metadata_index,
+        max_candidates=RETRIEVER_MAX_CANDIDATES,
+        max_tokens=RETRIEVER_TOKEN_BUDGET)
+    return create_react_agent(
+        model=model,
+        tools=[retriever_tool],
+        prompt=RESUME_MATCHING_AGENT_PROMPT,
+        response_format= QuestionResponse
+        )
+
+question_semaphore = asyncio.Semaphore(QUESTION_MAX_CONCURRENCY)
+
+async def run_agent(query):
+    agent = await asyncio.to_thread(get_agent) #the first question may have to load the models
+    async with question_semaphore:
+        with QUESTIONS_IN_PROGRESS.track_inprogress():
+            return await agent.ainvoke(
+                {"messages" : [{"role": "user", "content" : query}]}
+            )
+
+def record_question(endpoint, started, cached, tool_calls):
+    seconds = time.perf_counter() - started
+    QUESTION_SECONDS.labels(endpoint, str(cached).lower()).observe(seconds)
+    if not cached:
+        QUESTION_TOOL_CALLS.observe(tool_calls)
+    log_event("question_answered", endpoint=endpoint, cached=cached, tool_calls=tool_calls, seconds=round(seconds, 4))
 
 @app.post("/register")
-def register(user: UserRegister):
+async def register(user: UserRegister, request: Request):
     """
     Registers a new user.
 
     Args:
         user (UserRegister): The user registration data containing username and password.
+        request (Request): The incoming request, used to rate limit by client IP.
 
     Raises:
-        HTTPException: If the username already exists.
+        HTTPException: If the username already exists, or 429 if there were too many attempts.
 
     Returns:
         dict: A message indicating successful registration and the user's UUID.
     """
-    users = load_users()
-    if user.username in users:
+    await check_auth_rate_limit(request, user.username)
+    if user_store.get(user.username) is not None:
         raise HTTPException(status_code=400, detail="Username already exists")
-    users[user.username] = {
-        "password": hash_password(user.password),
-        "uuid": str(uuid.uuid4())
-    }
-    save_users(users)
-    return {"msg": "User registered", "uuid": users[user.username]["uuid"]}
+    user_uuid = user_store.create(user.username, await hash_password(user.password))
+    if user_uuid is None: #registered by a concurrent request while the password was being hashed
+        raise HTTPException(status_code=400, detail="Username already exists")
+    return {"msg": "User registered", "uuid": user_uuid}
 
 @app.post("/login")
-def login(user: UserLogin):
+async def login(user: UserLogin, request: Request):
     """
     Handles user login by verifying provided credentials.
 
     Args:
         user (UserLogin): The login credentials provided by the user.
+        request (Request): The incoming request, used to rate limit by client IP.
 
     Returns:
         dict: A dictionary containing a success message and the user's UUID if authentication is successful.
 
     Raises:
         HTTPException: If the username does not exist or the password is incorrect, raises a 401 Unauthorized error.
+            Raises a 429 error if the username or the client IP made too many attempts.
     """
-    users = load_users()
-    if user.username not in users:
+    await check_auth_rate_limit(request, user.username)
+    stored = user_store.get(user.username)
+    if stored is None:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    if not check_password(user.password, users[user.username]["password"]):
+    if not await check_password(user.password, stored["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"msg": "Login successful", "uuid": users[user.username]["uuid"]}
+    return {"msg": "Login successful", "uuid": stored["uuid"]}
 
 @app.post("/change-password")
-def change_password(data: PasswordChange):
+async def change_password(data: PasswordChange, request: Request):
     """
     Endpoint to change a user's password.
 
     Args:
         data (PasswordChange): An object containing the username, new password, and password confirmation.
+        request (Request): The incoming request, used to rate limit by client IP.
     Raises:
         HTTPException: 
             - 400 if the new password and confirmation do not match.
             - 404 if the specified user is not found.
+            - 429 if the username or the client IP made too many attempts.
     Returns:
         dict: A message indicating the password was changed successfully.
     """
     if data.new_password != data.confirm_password:
         raise HTTPException(status_code=400, detail="Passwords do not match")
 
-    users = load_users()
-    if data.username not in users:
+    await check_auth_rate_limit(request, data.username)
+    if user_store.get(data.username) is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    users[data.username]["password"] = hash_password(data.new_password)
-    save_users(users)
+    user_store.set_password(data.username, await hash_password(data.new_password))
     return {"msg": "Password changed successfully"}
 
-@app.post("/upload")
-async def upload_files(files: List[UploadFile] = File(...), user_uuid: str = Depends(verify_uuid)):
+UPLOAD_ALLOWED_TYPES = ["application/pdf", "image/png", "image/jpeg", "image/jpg"]
+
+@app.post("/upload", response_model=UploadResponse, openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["files"],
+            "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+        }}},
+    }
+})
+async def upload_files(request: Request, user_uuid: str = Depends(verify_uuid)):
     """
-    Endpoint to upload and process resume files.
-    Accepts multiple files (PDF, PNG, JPEG, JPG), performs OCR extraction, processes the extracted text with a language model to generate structured JSON outputs, and stores the results. The processed documents are also chunked and added to a vector store for further use.
+    Endpoint to upload resume files for processing.
+    Accepts multiple files (PDF, PNG, JPEG, JPG) in the `files` field of a multipart form, saves them and enqueues one job per file. The OCR extraction, the structured output generation and the vector store indexing run in background workers, so the request returns right away.
+    The body is parsed as it arrives: each file is written straight to disk in UPLOAD_CHUNK_SIZE_KB writes and hashed on the way, so the upload is never held in memory and the workers do not read the file again to hash it.
     Args:
-        files (List[UploadFile]): List of files to be uploaded and processed.
+        request (Request): The multipart/form-data request with the files.
         user_uuid (str): User UUID, validated via dependency injection.
     Returns:
-        dict: A dictionary containing the list of paths to the created JSON files.
+        UploadResponse: The batch ID of this upload and the job created for each file. Use `/jobs/{job_id}` or `/jobs?batch_id=` to follow the progress.
     Raises:
-        HTTPException: If an unsupported file type is uploaded.
-    Workflow:
-        1. Validates file types and saves them temporarily.
-        2. Runs OCR on each file and saves the OCR output as JSON.
-        3. Extracts recognized texts from OCR outputs.
-        4. Uses a language model to generate structured resume data from OCR text.
-        5. Saves structured data as JSON files with sanitized filenames.
-        6. Loads each JSON, chunks the document, and adds chunks to a vector store.
-        7. Returns the list of created JSON file paths.
+        HTTPException: 400 if an unsupported file type or no file is uploaded, 413 if a file is larger than UPLOAD_MAX_FILE_MB or the request larger than UPLOAD_MAX_REQUEST_MB. No job is created in that case.
     """
-    allowed_types = ["application/pdf", "image/png", "image/jpeg", "image/jpg"]
-    saved_paths = []
-
-    tmp_dir = "tmp"
-    output_dir = "resumes_processed" #folder where the resumes structured output will be saved.
-
-    os.makedirs(tmp_dir, exist_ok=True)
-    os.makedirs(output_dir, exist_ok=True)
-
-    for file in files:
-        if file.content_type not in allowed_types:
-            raise HTTPException(status_code=400, detail=f"Unsupported file type: {file.content_type}")
+    with ingest_stage("save", None):
+        try:
+            uploads = await receive_uploads(
+                request, TMP_DIR, UPLOAD_ALLOWED_TYPES,
+                max_file_bytes=int(UPLOAD_MAX_FILE_MB * 1024 * 1024),
+                max_request_bytes=int(UPLOAD_MAX_REQUEST_MB * 1024 * 1024),
+                chunk_size=UPLOAD_CHUNK_SIZE_KB * 1024)
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    batch_id = str(uuid.uuid4())
+    jobs = []
+
+    for upload in uploads:
+        job = job_queue.enqueue(batch_id, upload.filename, upload.path, content_type=upload.content_type,
+                                user_uuid=user_uuid, content_hash=upload.sha256)
+        log_event("job_enqueued", job_id=job["id"], batch_id=batch_id, filename=upload.filename, size=upload.size)
+        jobs.append(JobStatus(**job))
+
+    return UploadResponse(batch_id=batch_id, jobs=jobs)
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, user_uuid: str = Depends(verify_uuid)):
+    """
+    Endpoint to check the progress of a single upload job.
 
-        suffix = "." + file.filename.split(".")[-1]
-        tmp_filename = next(tempfile._get_candidate_names()) + suffix
-        tmp_path = os.path.join(tmp_dir, tmp_filename)
+    Args:
+        job_id (str): The job ID returned by `/upload`.
+        user_uuid (str): User UUID, validated via dependency injection.
 
-        async with aiofiles.open(tmp_path, "wb") as out_file:
-            while content := await file.read(1024):  # Read in chunks
-                await out_file.write(content)
+    Raises:
+        HTTPException: If the job does not exist, returns a 404 error.
 
-        saved_paths.append(tmp_path)
+    Returns:
+        JobStatus: The job status (queued, running, done or failed), the current pipeline stage and its result.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatus(**job)
+
+@app.get("/jobs", response_model=list[JobStatus])
+async def list_jobs(
+    status: Optional[str] = Query(None),
+    batch_id: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    user_uuid: str = Depends(verify_uuid)
+):
+    """
+    Endpoint to list upload jobs, optionally filtered by status and batch.
 
-    for file in saved_paths:
-        result = ocr.predict(input=file)
+    Args:
+        status (str): Only return jobs in this status (queued, running, done or failed).
+        batch_id (str): Only return jobs created by this upload.
+        limit (int): Maximum number of jobs to return (default: 100, min: 1, max: 1000).
+        offset (int): Number of jobs to skip (default: 0, min: 0).
+        user_uuid (str): User UUID, validated via dependency injection.
 
-        for res in result:
-            res.save_to_json(tmp_dir)
-        
-        os.remove(file) #limpando o arquivo da memória após processar com OCR
-    
-    ocrs_to_process = os.listdir(tmp_dir)
-    rec_texts = []  #este são os textos extraídos do OCR, o que vamos usar para obter o structured output
-
-    for path in ocrs_to_process:
-        file_to_open = f"{tmp_dir}/{path}"
-        with open(file_to_open) as file:
-            file_data = json.load(file)
-            rec_texts.append(file_data.get("rec_texts"))
-        
-        os.remove(file_to_open) #cleaning the OCR json
-    
-    created_jsons = [] #list that holds the path of each json created for the execution right now
-    
-    for item in rec_texts:
-        prompt = RESUME_EXTRACTION_PROMPT.format(ocr_data=item)
-
-        client = genai.Client(api_key=GEMINI_API_KEY)
-
-        response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
-        config={
-            "response_mime_type": "application/json",
-            "response_schema": ResumeData,
-        })
-
-        res = json.loads(response.text)
-
-        if res["full_name"] is not None:
-            # Convert to lowercase
-            file_name = res["full_name"].lower()
-            # Remove spaces
-            file_name = file_name.replace(" ", "")
-            # Remove special characters using regex (keeps only alphanumeric characters)
-            file_name = re.sub(r'[^a-z0-9]', '', file_name)
-        else:
-            file_name = str(uuid.uuid4())
-
-        path_file = f"{output_dir}/{file_name}.json"
-
-        with open(path_file, "w") as json_file:
-            json.dump(res,json_file,indent=4)
-            created_jsons.append(path_file)
-    
-    for file in created_jsons:
-        document = load_json_with_jsonloader(file)
+    Raises:
+        HTTPException: If the status is not a valid job status.
 
-        doc_chunks = chunk_documents(documents=document, chunk_size=150, chunk_overlap=25) #small docs
+    Returns:
+        list[JobStatus]: The matching jobs, oldest first.
+    """
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
+    jobs = job_queue.list(status=status, batch_id=batch_id, limit=limit, offset=offset)
+    return [JobStatus(**job) for job in jobs]
 
-        uuids = [str(uuid.uuid4()) for _ in range(len(doc_chunks))]
+@app.get("/cache/stats")
+async def cache_stats(user_uuid: str = Depends(verify_uuid)):
+    """
+    Endpoint to inspect the deduplication cache used by the upload pipeline.
 
-        vector_store.add_documents(documents=doc_chunks, ids=uuids)
+    Args:
+        user_uuid (str): User UUID, validated via dependency injection.
 
-    return {"json_files": created_jsons}
+    Returns:
+        dict: For each namespace ("ocr" and "extraction"), the hits and misses recorded by every process sharing the cache (API and ingest workers) and the number of stored entries.
+    """
+    return content_cache.stats()
 
 @app.get("/resumes", response_model=ResumePage)
 async def list_resumes(
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    sort: str = Query("filename"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    fields: List[str] = Query([]),
     user_uuid: str = Depends(verify_uuid)
 ):
     """
@@ -304,95 +837,394 @@ async def list_resumes(
 
     Args:
         limit (int): Maximum number of resumes to return (default: 10, min: 1, max: 100).
-        offset (int): Number of resumes to skip before starting to collect the result set (default: 0, min: 0).
+        offset (int): Number of resumes to skip before starting to collect the result set (default: 0, min: 0). Ignored when a cursor is given.
+        cursor (str): The `next_cursor` returned by the previous page. Continues right after it, with the same sort and order.
+        sort (str): Sort key: "filename" (default), "full_name" or "ingested_at".
+        order (str): "asc" (default) or "desc".
+        fields (List[str]): Resume fields to return in each content (repeat the parameter for several). Defaults to the whole resume.
         user_uuid (str): User UUID, validated by dependency injection.
 
     Returns:
-        ResumePage: An object containing the total number of resumes and a list of ResumeMetadata objects for the current page.
+        ResumePage: An object containing the total number of resumes, a list of ResumeMetadata objects for the current page and the cursor of the next page (null on the last one).
 
     Raises:
-        HTTPException: If the directory does not exist or files cannot be read.
+        HTTPException: 400 if the sort key, a field or the cursor is invalid.
 
     Notes:
-        - Only files ending with ".json" in the "resumes_processed" directory are considered.
-        - Pagination is applied based on the provided limit and offset.
+        - Resumes are read from the resume catalog (data/catalog.sqlite3), updated whenever a resume is processed or deleted.
+        - Prefer the cursor over large offsets: each cursor page is an index lookup, while an offset still walks every skipped row.
+        - Asking only for summary fields (full_name, current_position, email, phone, linkedin, github, professional_summary) avoids reading the full resumes.
+    """
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort: {sort}")
+    invalid_fields = [field for field in fields if field not in ResumeData.model_fields]
+    if invalid_fields:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(invalid_fields)}")
+
+    try:
+        total, rows, next_cursor = resume_catalog.page(
+            limit=limit, cursor=cursor, offset=offset, sort=sort, descending=order == "desc", fields=fields or None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ResumePage(total=total, resumes=[ResumeMetadata(**row) for row in rows], next_cursor=next_cursor)
+
+@app.get("/resumes/search", response_model=ResumeSearchResult)
+async def search_resumes(
+    skill: List[str] = Query([]),
+    language: List[str] = Query([]),
+    certification: List[str] = Query([]),
+    position: Optional[str] = Query(None),
+    user_uuid: str = Depends(verify_uuid)
+):
     """
-    # List files in the processed directory
-    dir_path = "resumes_processed"
-    all_files = sorted(f for f in os.listdir(dir_path) if f.endswith(".json"))
-    total = len(all_files)
+    Endpoint to find resumes by structured fields, using the metadata index instead of the vector store.
 
-    # Apply pagination
-    page_files = all_files[offset : offset + limit]
+    Args:
+        skill (List[str]): Skills the candidate must list (repeat the parameter for several, all are required).
+        language (List[str]): Languages the candidate must speak (all are required).
+        certification (List[str]): Text that must appear in one of the candidate's certifications (all are required).
+        position (str): Text that must appear in the candidate's current position.
+        user_uuid (str): User UUID, validated via dependency injection.
 
-    resumes = []
-    for fname in page_files:
-        path = os.path.join(dir_path, fname)
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        resumes.append(ResumeMetadata(filename=fname, content=data))
+    Returns:
+        ResumeSearchResult: The number of matching resumes and their file names.
 
-    return ResumePage(total=total, resumes=resumes)
+    Notes:
+        - Skills and languages are compared case-insensitively and ignoring qualifiers, so "english" matches "English (Fluent)".
+    """
+    files = metadata_index.search(skills=skill, languages=language, certifications=certification, position=position)
+    return ResumeSearchResult(total=len(files), files=files)
 
-@app.post("/question")
-async def ask_question(
-    payload: QuestionRequest,
+@app.delete("/resumes/{filename}")
+async def delete_resume(
+    filename: str,
     user_uuid: str = Depends(verify_uuid)
 ):
     """
+    Endpoint to delete a processed resume, removing both its JSON file and its chunks from the vector store.
+
     Args:
-        payload (QuestionRequest): The request body containing the user's query.
-        user_uuid (str): The unique identifier for the user, validated via dependency injection.
-    Process:
-        - Extracts the query from the payload.
-        - Initializes a retriever from the vector store.
-        - Sets up a retrieval tool and a reactive agent with the specified prompt and response format.
-        - Invokes the agent with the user's query and obtains a structured response.
-        - Logs the request and response details into TinyDB for auditing or analytics.
-        - Constructs file download URLs for any files referenced in the response.
+        filename (str): The name of the resume file, as returned by `/resumes` or `/question`.
+        user_uuid (str): User UUID, validated via dependency injection.
+
+    Raises:
+        HTTPException: 400 if the filename is not a resume JSON name, 404 if there is neither a file nor indexed chunks for it.
+
     Returns:
-        dict: The structured response from the agent, including file download URLs.
+        dict: A message and the number of chunks removed from the vector store.
     """
-    query = payload.query
+    if os.path.basename(filename) != filename or not filename.endswith(".json"):
+        raise HTTPException(status_code=400, detail="Invalid filename")
 
-    retriever = vector_store.as_retriever()
+    file_path = os.path.join(OUTPUT_DIR, filename)
+    file_exists = os.path.exists(file_path)
 
-    retriever_tool = RetrieveResumesTool(retriever=retriever)
+    vector_store = await asyncio.to_thread(get_vector_store)
+    removed_chunks = delete_chunks(vector_store, [filename, *legacy_sources(filename)], lexical_index=bm25_index)
 
-    agent = create_react_agent(
-        model=llm,
-        tools=[retriever_tool],
-        prompt=RESUME_MATCHING_AGENT_PROMPT,
-        response_format= QuestionResponse
-        )
-    
-    res = agent.invoke(
-        {"messages" : [{"role": "user", "content" : query}]}
+    if not file_exists and removed_chunks == 0:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if file_exists:
+        os.remove(file_path)
+    metadata_index.delete(filename)
+    resume_catalog.delete(filename)
+    get_answer_cache().bump_corpus_version()
+
+    return {"msg": "Resume deleted", "removed_chunks": removed_chunks}
+
+@app.get("/admin/export")
+async def admin_export(
+    include_embeddings: bool = Query(True),
+    user_uuid: str = Depends(verify_admin)
+):
+    """
+    Endpoint to download the whole processed resume corpus as a compressed Parquet file, to back it up or to seed another node.
+
+    Args:
+        include_embeddings (bool): Also export the chunks of every resume with their embeddings (default: true), so the importing node does not embed them again.
+        user_uuid (str): User UUID of an admin (ADMIN_USERS), validated via dependency injection.
+
+    Raises:
+        HTTPException: 403 if the user is not an admin.
+
+    Returns:
+        FileResponse: The Parquet file, deleted from the server once sent.
+    """
+    os.makedirs(TMP_DIR, exist_ok=True)
+    path = os.path.join(TMP_DIR, f"corpus-{uuid.uuid4()}.parquet")
+    await asyncio.to_thread(export_resume_corpus, path, include_embeddings)
+    return FileResponse(
+        path=path,
+        filename="resume_corpus.parquet",
+        media_type="application/vnd.apache.parquet",
+        background=BackgroundTask(os.remove, path)
     )
 
-    resp_struct = res["structured_response"]
+@app.post("/admin/import")
+async def admin_import(
+    file: UploadFile = File(...),
+    user_uuid: str = Depends(verify_admin)
+):
+    """
+    Endpoint to load a corpus exported by `/admin/export` (or `python -m corpus_io export`), without running OCR or the language model again.
+
+    Args:
+        file (UploadFile): The Parquet file.
+        user_uuid (str): User UUID of an admin (ADMIN_USERS), validated via dependency injection.
+
+    Raises:
+        HTTPException: 403 if the user is not an admin, 400 if the file is not a corpus export.
+
+    Returns:
+        dict: The number of resumes imported, of chunks restored with their stored embeddings and of resumes that had to be embedded again (exported without embeddings or with another embedding model).
+    """
+    os.makedirs(TMP_DIR, exist_ok=True)
+    path = os.path.join(TMP_DIR, f"corpus-{uuid.uuid4()}.parquet")
+    async with aiofiles.open(path, "wb") as out_file:
+        while content := await file.read(1024 * 1024):
+            await out_file.write(content)
+    try:
+        return await asyncio.to_thread(import_resume_corpus, path)
+    except (ValueError, pa.ArrowInvalid) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(path)
+
+async def lookup_cached_answer(query):
+    """Returns (QuestionResponse stored for a similar question or None, corpus version, query embedding)."""
+    if not ANSWER_CACHE_THRESHOLD:
+        return None, None, None
+    answer_cache = await asyncio.to_thread(get_answer_cache)
+    corpus_version = answer_cache.corpus_version()
+    query_vector = await asyncio.to_thread(answer_cache.embed, query)
+    cached = await asyncio.to_thread(answer_cache.lookup, query_vector, corpus_version)
+    return (QuestionResponse(**cached[0]) if cached is not None else None), corpus_version, query_vector
+
+async def finish_question(query, user_uuid, resp_struct, cached, corpus_version=None, query_vector=None):
+    """Stores a new answer in the answer cache, logs the question and returns the response sent to the user."""
+    if not cached and ANSWER_CACHE_THRESHOLD:
+        await asyncio.to_thread(get_answer_cache().store, query, query_vector, resp_struct.model_dump(), corpus_version)
 
     # Prepare log record
     record = {
-        "request_id": str(uuid.uuid4()),
+        "request_id": request_id_var.get() or str(uuid.uuid4()), #the X-Request-ID of the trace logs
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "user_uuid": user_uuid,
         "query": query,
-        "response": resp_struct.model_dump()
+        "response": resp_struct.model_dump(),
+        "cached": cached
     }
 
-    # Insert into TinyDB
-    db.insert(record)
+    audit_log.log(record)
 
     base_url = "http://localhost:8000"
 
     resp = {
     **resp_struct.model_dump(),
-    "file_urls": [f"{base_url}/downloads/{f}?user_uuid={user_uuid}" for f in resp_struct.files]
+    "file_urls": [f"{base_url}/downloads/{f}?user_uuid={user_uuid}" for f in resp_struct.files],
+    "cached": cached
     }
 
     return resp
 
+@app.post("/question")
+async def ask_question(
+    payload: QuestionRequest,
+    user_uuid: str = Depends(verify_uuid)
+):
+    """
+    Args:
+        payload (QuestionRequest): The request body containing the user's query.
+        user_uuid (str): The unique identifier for the user, validated via dependency injection.
+    Process:
+        - Extracts the query from the payload.
+        - Returns the stored answer of a previous question if it is similar enough (ANSWER_CACHE_THRESHOLD) and the resumes did not change since.
+        - Runs the shared agent (hybrid vector + BM25 retrieval tool, built on first use or by the startup warm-up) asynchronously, at most QUESTION_MAX_CONCURRENCY questions at a time, and obtains a structured response.
+        - Queues the request and response details in the audit log, written to disk in the background.
+        - Constructs file download URLs for any files referenced in the response.
+    Returns:
+        dict: The structured response from the agent, including file download URLs and whether it came from the answer cache.
+    Raises:
+        HTTPException: 504 if the answer is not ready within QUESTION_TIMEOUT seconds (waiting for a free slot included).
+    """
+    query = payload.query
+    started = time.perf_counter()
+
+    resp_struct, corpus_version, query_vector = await lookup_cached_answer(query)
+    cached = resp_struct is not None
+
+    tool_calls = 0
+    if not cached:
+        try:
+            res = await asyncio.wait_for(run_agent(query), timeout=QUESTION_TIMEOUT)
+        except asyncio.TimeoutError:
+            log_event("question_timeout", endpoint="question")
+            raise HTTPException(status_code=504, detail="The question took too long to answer, please try again")
+        resp_struct = res["structured_response"]
+        tool_calls = sum(len(getattr(message, "tool_calls", None) or []) for message in res["messages"])
+
+    record_question("question", started, cached, tool_calls)
+    return await finish_question(query, user_uuid, resp_struct, cached, corpus_version, query_vector)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def message_text(content):
+    # Chat model chunks carry either a string or a list of content parts
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+@app.post("/question/stream")
+async def ask_question_stream(
+    payload: QuestionRequest,
+    user_uuid: str = Depends(verify_uuid)
+):
+    """
+    Streaming version of `/question`, answering with Server-Sent Events while the agent works.
+
+    Args:
+        payload (QuestionRequest): The request body containing the user's query.
+        user_uuid (str): The unique identifier for the user, validated via dependency injection.
+    Events:
+        - `tool_call`: The agent searched the resumes, with the search `query`, `skills` and `languages`.
+        - `tool_result`: The resume `files` found by that search.
+        - `token`: A piece of the answer text, as generated by the model.
+        - `answer`: The final payload, the same returned by `/question` (answer, files, file_urls, cached). Always the last event on success.
+        - `error`: The question failed or took longer than QUESTION_TIMEOUT seconds, with a `detail` message.
+    Returns:
+        StreamingResponse: The `text/event-stream` response.
+    """
+    query = payload.query
+
+    async def events():
+        started = time.perf_counter()
+        resp_struct, corpus_version, query_vector = await lookup_cached_answer(query)
+        cached = resp_struct is not None
+        tool_calls = 0
+
+        if not cached:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + QUESTION_TIMEOUT
+            queue = asyncio.Queue()
+            result = {}
+
+            async def produce():
+                try:
+                    agent = await asyncio.to_thread(get_agent)
+                    async with question_semaphore:
+                        with QUESTIONS_IN_PROGRESS.track_inprogress():
+                            async for event in agent.astream_events(
+                                {"messages" : [{"role": "user", "content" : query}]}, version="v2"
+                            ):
+                                kind, data = event["event"], event["data"]
+                                if kind == "on_tool_start" and event["name"] == "retrieve_resumes":
+                                    await queue.put(("tool_call", data.get("input", {})))
+                                elif kind == "on_tool_end" and event["name"] == "retrieve_resumes":
+                                    await queue.put(("tool_result", {"files": getattr(data.get("output"), "artifact", None) or []}))
+                                elif kind == "on_chat_model_stream" and event["metadata"].get("langgraph_node") == "agent":
+                                    if text := message_text(data["chunk"].content):
+                                        await queue.put(("token", {"text": text}))
+                                elif kind == "on_chain_end" and not event["parent_ids"]:
+                                    result["structured_response"] = data["output"]["structured_response"]
+                finally:
+                    await queue.put(None)
+
+            task = asyncio.create_task(produce())
+            try:
+                while (item := await asyncio.wait_for(queue.get(), timeout=max(deadline - loop.time(), 0))) is not None:
+                    tool_calls += item[0] == "tool_call"
+                    yield sse_event(*item)
+                await task
+                resp_struct = result["structured_response"]
+            except asyncio.TimeoutError:
+                log_event("question_timeout", endpoint="question_stream")
+                yield sse_event("error", {"detail": "The question took too long to answer, please try again"})
+                return
+            except Exception as e:
+                log_event("question_failed", endpoint="question_stream", error=f"{type(e).__name__}: {e}")
+                yield sse_event("error", {"detail": f"{type(e).__name__}: {e}"})
+                return
+            finally:
+                task.cancel()
+
+        record_question("question_stream", started, cached, tool_calls)
+        resp = await finish_question(query, user_uuid, resp_struct, cached, corpus_version, query_vector)
+        yield sse_event("answer", resp)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/logs")
+async def list_logs(
+    username: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    user_uuid: str = Depends(verify_admin)
+):
+    """
+    Endpoint to query the audit log of the `/question` requests, newest first.
+
+    Args:
+        username (str): Only return the questions asked by this user.
+        since (datetime): Only return questions asked at or after this time (ISO 8601, UTC if no timezone is given).
+        until (datetime): Only return questions asked before this time (ISO 8601, UTC if no timezone is given).
+        limit (int): Maximum number of records to return (default: 100, min: 1, max: 1000).
+        user_uuid (str): User UUID of an admin (ADMIN_USERS), validated via dependency injection.
+
+    Raises:
+        HTTPException: 403 if the user is not an admin, 404 if the username does not exist.
+
+    Returns:
+        list[dict]: The log records (request_id, timestamp, user_uuid, query and response).
+    """
+    log_user_uuid = None
+    if username is not None:
+        user = user_store.get(username)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        log_user_uuid = user["uuid"]
+    since, until = [
+        value.replace(tzinfo=timezone.utc) if value is not None and value.tzinfo is None else value
+        for value in (since, until)
+    ]
+    return await asyncio.to_thread(audit_log.query, user_uuid=log_user_uuid, since=since, until=until, limit=limit)
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Endpoint exposing the API and pipeline metrics in the Prometheus text format, to be scraped by Prometheus.
+
+    Returns:
+        Response: Per-stage ingestion timings, OCR pages, Gemini requests/tokens/throttling, embedding cache hits,
+        question latency and tool calls, HTTP latency by route, in-progress gauges and the job queue size by status.
+    """
+    for status, count in job_queue.count_by_status().items():
+        JOB_QUEUE_JOBS.labels(status).set(count)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/ready")
+async def ready(response: Response):
+    """
+    Readiness probe, reporting which shared components (models and stores) are loaded.
+
+    Returns:
+        dict: Whether the process is ready, whether the startup warm-up is on, whether this process also runs the ingest workers and, for each component it uses, if it is loaded, how long it took to load (seconds) and the error of its last failed load.
+
+    Notes:
+        - With WARM_UP_ON_STARTUP the status code is 503 until every component is loaded, so traffic only reaches warm replicas.
+        - Without it components load on first use and the process is always ready.
+        - API-only replicas (RUN_INGEST_WORKERS=False) do not wait for the OCR engine and the extractor.
+    """
+    component_status = {name: status for name, status in components.status().items() if name in served_components()}
+    is_ready = not WARM_UP_ON_STARTUP or all(status["loaded"] for status in component_status.values())
+    if not is_ready:
+        response.status_code = 503
+    return {"ready": is_ready, "warm_up": WARM_UP_ON_STARTUP, "ingest_workers": RUN_INGEST_WORKERS,
+            "components": component_status}
+
 @app.get("/downloads/{filename}")
 async def download_file(
     filename: str,
@@ -409,7 +1241,7 @@ async def download_file(
         FileResponse: The requested file as a JSON response with appropriate headers.
     """
 
-    file_path = os.path.join("resumes_processed", filename)
+    file_path = os.path.join(OUTPUT_DIR, filename)
     
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
@@ -0,0 +1,121 @@
+import json, os, re, sqlite3
+from contextlib import contextmanager
+
+# ResumeData list fields indexed for filtering, and the kind they are stored as
+INDEXED_FIELDS = {
+    "technical_skills": "skill",
+    "soft_skills": "skill",
+    "languages": "language",
+    "certifications": "certification",
+}
+
+def normalize_term(value):
+    """
+    Normalizes a skill/language/certification for exact matching:
+    lowercase, without qualifiers like "(Fluent)" or ": Native", and with collapsed whitespace.
+    """
+    value = re.split(r"\(|:| - | – | — ", value.lower())[0]
+    return " ".join(value.split()).strip(" .,;")
+
+
+class MetadataIndex:
+    """
+    Structured index of the resumes in a local SQLite file, used to pre-filter candidates.
+
+    For every resume file it stores the name and current position, plus one normalized row per technical/soft
+    skill, language and certification, so queries like "Python + AWS + English" are answered with indexed lookups
+    before any vector search runs.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS resumes (
+                    source TEXT PRIMARY KEY,
+                    full_name TEXT,
+                    current_position TEXT
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS resume_terms (
+                    kind TEXT NOT NULL,
+                    term TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    PRIMARY KEY (kind, term, source)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_resume_terms_source ON resume_terms (source)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+
+    def upsert(self, source, resume):
+        """Indexes (or re-indexes) one resume, given as a ResumeData dict."""
+        terms = set()
+        for field, kind in INDEXED_FIELDS.items():
+            for value in resume.get(field) or []:
+                if value and (term := normalize_term(value)):
+                    terms.add((kind, term, source))
+
+        with self._connect() as conn:
+            conn.execute("DELETE FROM resume_terms WHERE source = ?", (source,))
+            conn.execute(
+                "INSERT OR REPLACE INTO resumes (source, full_name, current_position) VALUES (?, ?, ?)",
+                (source, resume.get("full_name"), resume.get("current_position")),
+            )
+            conn.executemany("INSERT INTO resume_terms (kind, term, source) VALUES (?, ?, ?)", list(terms))
+
+    def delete(self, source):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM resume_terms WHERE source = ?", (source,))
+            conn.execute("DELETE FROM resumes WHERE source = ?", (source,))
+
+    def rebuild_from_dir(self, dir_path):
+        """Indexes every resume JSON in a folder. Returns the number of resumes indexed."""
+        total = 0
+        for fname in sorted(os.listdir(dir_path)):
+            if fname.endswith(".json"):
+                with open(os.path.join(dir_path, fname), encoding="utf-8") as f:
+                    self.upsert(fname, json.load(f))
+                total += 1
+        return total
+
+    def search(self, skills=(), languages=(), certifications=(), position=None):
+        """
+        Returns the sources (resume file names) matching every given filter, sorted by name.
+
+        Skills and languages must match exactly after normalization; certifications and position match when they
+        contain the given text (e.g. "aws" matches "AWS Certified AI Practitioner").
+        """
+        clauses, params = [], []
+        for kind, values in (("skill", skills), ("language", languages)):
+            for value in values:
+                clauses.append("source IN (SELECT source FROM resume_terms WHERE kind = ? AND term = ?)")
+                params.extend([kind, normalize_term(value)])
+        for value in certifications:
+            clauses.append("source IN (SELECT source FROM resume_terms WHERE kind = 'certification' AND term LIKE ?)")
+            params.append(f"%{normalize_term(value)}%")
+        if position:
+            clauses.append("LOWER(current_position) LIKE ?")
+            params.append(f"%{position.lower().strip()}%")
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT source FROM resumes {where} ORDER BY source", params).fetchall()
+        return [row[0] for row in rows]
@@ -0,0 +1,81 @@
+"""
+Prometheus metrics and structured trace logs of the API and the ingestion pipeline.
+
+Metrics are exposed in the Prometheus text format by the `/metrics` endpoint. Trace logs are JSON lines on stdout,
+each one carrying the ID of the request (or job) it belongs to, so a slow request can be followed through every
+stage.
+"""
+import contextvars, json, logging, sys, time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from prometheus_client import Counter, Gauge, Histogram
+
+# Buckets in seconds, from a cached lookup to a long OCR or agent run
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"], buckets=DURATION_BUCKETS)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served")
+
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_duration_seconds", "Time spent in each ingestion stage", ["stage"], buckets=DURATION_BUCKETS)
+INGEST_JOBS = Counter("ingest_jobs_total", "Finished ingestion jobs", ["result"])  #done, cached or failed
+INGEST_JOBS_IN_PROGRESS = Gauge("ingest_jobs_in_progress", "Ingestion jobs being processed")
+JOB_QUEUE_JOBS = Gauge("job_queue_jobs", "Jobs in the queue by status", ["status"])
+OCR_PAGES = Counter("ocr_pages_total", "Pages recognized by the OCR (cache hits excluded)")
+
+GEMINI_REQUESTS = Counter("gemini_requests_total", "Extraction requests sent to Gemini", ["outcome"])  #ok, retried or error
+GEMINI_REQUEST_SECONDS = Histogram(
+    "gemini_request_duration_seconds", "Latency of the extraction requests", buckets=DURATION_BUCKETS)
+GEMINI_THROTTLE_SECONDS = Histogram(
+    "gemini_throttle_wait_seconds", "Time extraction requests waited for the RPM/TPM quotas", buckets=DURATION_BUCKETS)
+GEMINI_TOKENS = Counter("gemini_tokens_total", "Tokens of the extraction requests", ["direction"])  #sent or received
+GEMINI_REQUESTS_IN_PROGRESS = Gauge("gemini_requests_in_progress", "Extraction requests waiting for Gemini")
+
+EMBEDDING_TEXTS = Counter("embedding_texts_total", "Texts to embed, by embedding cache result", ["cache"])  #hit or miss
+EMBEDDING_BATCH_SECONDS = Histogram(
+    "embedding_batch_duration_seconds", "Time to embed one batch with the model", buckets=DURATION_BUCKETS)
+
+QUESTION_SECONDS = Histogram(
+    "question_duration_seconds", "Time to answer a question", ["endpoint", "cached"], buckets=DURATION_BUCKETS)
+QUESTION_TOOL_CALLS = Histogram(
+    "question_tool_calls", "retrieve_resumes calls made by the agent per question", buckets=(0, 1, 2, 3, 4, 5, 7, 10, 15))
+QUESTIONS_IN_PROGRESS = Gauge("questions_in_progress", "Questions being answered by the agent")
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "event": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None) or request_id_var.get()
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+logger = logging.getLogger("resume_api.trace")
+if not logger.handlers:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+def log_event(event, request_id=None, **fields):
+    """Writes one JSON trace line. The request ID defaults to the one of the request being served."""
+    logger.info(event, extra={"request_id": request_id, "fields": fields})
+
+@contextmanager
+def ingest_stage(stage, job_id):
+    """Times one ingestion stage into INGEST_STAGE_SECONDS and logs it with the job ID."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        INGEST_STAGE_SECONDS.labels(stage).observe(seconds)
+        log_event("ingest_stage", request_id=job_id, stage=stage, seconds=round(seconds, 4))
@@ -0,0 +1,135 @@
+import os, threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+_ocr = None  #PaddleOCR instance owned by each worker process
+_warm_up_barrier = None
+
+def _init_worker(ocr_kwargs, warm_up_barrier):
+    global _ocr, _warm_up_barrier
+    from paddleocr import PaddleOCR
+    _ocr = PaddleOCR(**ocr_kwargs)
+    _warm_up_barrier = warm_up_barrier
+
+def _warm_up(timeout):
+    # Runs after the initializer loaded the model. Blocking on the barrier until every worker got here keeps each
+    # warm-up task in its own process, and proves that all of them loaded the model.
+    _warm_up_barrier.wait(timeout)
+    return os.getpid()
+
+def _render_pdf_page(path, page_index, scale):
+    import numpy as np
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(path)
+    try:
+        image = pdf[page_index].render(scale=scale).to_pil().convert("RGB")
+    finally:
+        pdf.close()
+    return np.ascontiguousarray(np.array(image)[:, :, ::-1])  #PaddleOCR expects BGR images, like OpenCV
+
+def _recognize(path, page_index, scale, debug_dir):
+    """Runs inside a worker process: OCRs a whole image file or a single page of a PDF."""
+    input = path if page_index is None else _render_pdf_page(path, page_index, scale)
+    texts = []
+    for res in _ocr.predict(input=input):
+        if debug_dir is not None:
+            page_dir = debug_dir if page_index is None else os.path.join(debug_dir, f"page_{page_index}")
+            os.makedirs(page_dir, exist_ok=True)
+            res.save_to_json(page_dir)
+        texts.extend(res["rec_texts"])
+    return texts
+
+
+class OCREngine:
+    """
+    Pool of pre-warmed PaddleOCR workers, each one running in its own process.
+
+    Multi-page PDFs are split so every page is an independent task, and the pages of all the files being processed
+    at the same time are spread across the workers. The results are put back together in page order.
+
+    If a worker process dies (crash, out of memory), the pool is rebuilt and warmed up again, and the file is retried
+    once.
+
+    Args:
+        num_workers (int, optional): Number of OCR processes. Defaults to the number of CPU cores.
+        pdf_render_scale (float): Zoom used to render PDF pages into images (2.0 matches what PaddleOCR uses).
+        **ocr_kwargs: Arguments forwarded to the PaddleOCR constructor in every worker.
+    """
+
+    def __init__(self, num_workers=None, pdf_render_scale=2.0, **ocr_kwargs):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.pdf_render_scale = pdf_render_scale
+        self.ocr_kwargs = ocr_kwargs
+        self._restart_lock = threading.Lock()
+        self._executor = self._build_executor()
+
+    def _build_executor(self):
+        context = mp.get_context("spawn")  #paddle does not survive a fork
+        return ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.ocr_kwargs, context.Barrier(self.num_workers)),  #shared by inheritance with every worker
+        )
+
+    def warm_up(self, timeout=600):
+        """
+        Starts every worker process and loads its OCR model, so the first upload does not pay for it. Returns the PIDs
+        of the workers, and raises if they did not all load the model within `timeout` seconds.
+        """
+        executor = self._executor
+        futures = [executor.submit(_warm_up, timeout) for _ in range(self.num_workers)]
+        return sorted({future.result() for future in futures})
+
+    def _restart(self, broken):
+        """Replaces a broken pool (one of its processes died) with a new, warmed up one."""
+        with self._restart_lock:
+            if self._executor is broken:  #not already replaced by another thread
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._build_executor()
+                self.warm_up()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def page_count(path):
+        """Returns the number of pages of a PDF, or None for image files."""
+        if not path.lower().endswith(".pdf"):
+            return None
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def submit(self, path, debug_dir=None, executor=None):
+        """Schedules the OCR of every page of a file and returns the list of futures, in page order."""
+        executor = executor or self._executor
+        count = self.page_count(path)
+        page_indexes = [None] if count is None else range(count)
+        return [
+            executor.submit(_recognize, path, page_index, self.pdf_render_scale, debug_dir)
+            for page_index in page_indexes
+        ]
+
+    def recognize(self, path, debug_dir=None):
+        """
+        Runs OCR on a file and returns the recognized texts of each page, in page order.
+
+        Args:
+            path (str): Path of the PDF or image file.
+            debug_dir (str, optional): If given, the raw OCR result of every page is also saved as JSON in this folder.
+        Returns:
+            list[list[str]]: The `rec_texts` of each page.
+        """
+        executor = self._executor
+        try:
+            return [future.result() for future in self.submit(path, debug_dir, executor)]
+        except BrokenProcessPool:
+            self._restart(executor)
+            return [future.result() for future in self.submit(path, debug_dir)]
@@ -69,6 +69,7 @@ PROCESS:
    - Technology-specific: "React", "Python", "AWS" 
    - Role-based: "Frontend Developer", "Senior Engineer"
    - Combined skills: "React Redux", "Python Django"
+   - Use the optional `skills` and `languages` filters for hard requirements (e.g. skills=["Python", "AWS"], languages=["English"]): only candidates listing all of them are searched
 3. Evaluate and rank candidates based on job fit
 
 You must return:
@@ -87,4 +88,17 @@ Write a clear explanation covering:
 - Why the second candidate ranks second (strengths and any gaps compared to #1)
 - Continue for remaining candidates
 - Mention any standout qualifications or concerns for each person
-"""
\ No newline at end of file
+"""
+RESUME_BATCH_EXTRACTION_PROMPT = """
+You are a resume information extraction specialist. You will receive several resume documents, each one given as a list of strings from OCR (Optical Character Recognition) processing.
+
+Follow exactly the same rules you would use for a single resume:
+- OCR data often contains concatenated words, missing spaces, words cut off and garbled text; use context clues to fix them
+- Extract information even if it's imperfect - do your best to interpret the meaning
+- If information is unclear or missing, set the field to null or empty list as appropriate
+- Never mix information from different documents
+
+Return a JSON array with exactly {count} objects, one per document, in the same order as the documents below. Return only valid JSON - no additional text or explanations.
+
+{documents}
+"""
@@ -0,0 +1,124 @@
+import asyncio, sqlite3, threading, time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+class TokenBucket:
+    """
+    Asynchronous token bucket used to stay under per-minute quotas (requests or tokens per minute).
+
+    The bucket starts full with `rate_per_minute` tokens and refills continuously. `acquire` waits until enough
+    tokens are available; callers are served in arrival order.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)  #a request bigger than the whole budget still goes through once it is full
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class SharedTokenBucket:
+    """
+    Token bucket kept in a SQLite file, shared by every process that uses the same file and `name` (e.g. the ingest
+    worker replicas on one data volume), so that together they stay under the quota. Same interface as TokenBucket.
+
+    `acquire` reserves its tokens in a single transaction, letting the balance go negative, then sleeps until the
+    balance it left would be paid back. Callers of every process are served in the order they reserved.
+    """
+
+    def __init__(self, db_path, name, rate_per_minute, capacity=None):
+        self.db_path = db_path
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _reserve(self, amount):
+        """Takes `amount` tokens and returns the seconds to wait before using them."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+                now = time.time()  #wall clock, shared by the processes unlike time.monotonic
+                tokens = self.capacity if row is None else min(self.capacity, row[0] + max(now - row[1], 0) * self.rate)
+                tokens -= amount
+                conn.execute("INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                             (self.name, tokens, now))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return max(-tokens, 0) / self.rate
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)  #a request bigger than the whole budget still goes through once it is full
+        wait = await asyncio.to_thread(self._reserve, amount)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class SlidingWindowLimiter:
+    """
+    Thread-safe sliding window limiter: allows at most `max_events` events per key within `window_seconds`.
+    """
+
+    def __init__(self, max_events, window_seconds):
+        self.max_events = max_events
+        self.window_seconds = window_seconds
+        self._events = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """
+        Records an event for `key` if it is allowed.
+        Returns 0 when allowed, otherwise the number of seconds until the next event would be allowed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if len(self._events) > 10000:
+                self._prune(now)
+            events = self._events[key]
+            while events and events[0] <= now - self.window_seconds:
+                events.popleft()
+            if len(events) >= self.max_events:
+                return events[0] + self.window_seconds - now
+            events.append(now)
+            return 0
+
+    def _prune(self, now):
+        for key in [key for key, events in self._events.items() if not events or events[-1] <= now - self.window_seconds]:
+            del self._events[key]
@@ -0,0 +1,156 @@
+import base64, json, os, sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Sort keys accepted by `ResumeCatalog.page`, mapped to their (indexed) column
+SORT_COLUMNS = {
+    "filename": "filename",
+    "full_name": "full_name",
+    "ingested_at": "ingested_at",
+}
+
+# ResumeData fields kept in the small summary projection, which is enough to render a listing
+SUMMARY_FIELDS = ("full_name", "current_position", "email", "phone", "linkedin", "github", "professional_summary")
+
+def encode_cursor(sort, descending, value, filename):
+    raw = json.dumps([sort, descending, value, filename], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Returns (sort, descending, value, filename) of a cursor. Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort, descending, value, filename = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if (not isinstance(sort, str) or not isinstance(descending, bool) or not isinstance(filename, str)
+            or value is not None and not isinstance(value, (str, int, float))):
+        raise ValueError("Invalid cursor")
+    return sort, descending, value, filename
+
+
+class ResumeCatalog:
+    """
+    Catalog of the processed resumes in a local SQLite file, used to list them without reading the output folder.
+
+    It holds one row per resume JSON with its name, current position, ingestion time, a summary projection and the
+    full content, and is updated at ingest/delete time. Listing uses keyset pagination on indexed columns, so getting
+    a page costs the same whether it is the first or the thousandth one.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS catalog (
+                    filename TEXT PRIMARY KEY,
+                    full_name TEXT NOT NULL,
+                    current_position TEXT,
+                    ingested_at TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    content TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_catalog_full_name ON catalog (full_name, filename)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_catalog_ingested_at ON catalog (ingested_at, filename)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM catalog").fetchone()[0]
+
+    def upsert(self, filename, resume, ingested_at=None):
+        """Adds (or replaces) a resume, given as a ResumeData dict. `ingested_at` defaults to now."""
+        ingested_at = ingested_at or datetime.now(timezone.utc).isoformat()
+        summary = {field: resume.get(field) for field in SUMMARY_FIELDS}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO catalog (filename, full_name, current_position, ingested_at, summary, content) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (filename, resume.get("full_name") or "", resume.get("current_position"), ingested_at,
+                 json.dumps(summary, ensure_ascii=False), json.dumps(resume, ensure_ascii=False)),
+            )
+
+    def delete(self, filename):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM catalog WHERE filename = ?", (filename,))
+
+    def rebuild_from_dir(self, dir_path):
+        """Catalogs every resume JSON in a folder, using the file modification time as ingestion time."""
+        total = 0
+        for fname in sorted(os.listdir(dir_path)):
+            if fname.endswith(".json"):
+                path = os.path.join(dir_path, fname)
+                with open(path, encoding="utf-8") as f:
+                    resume = json.load(f)
+                mtime = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).isoformat()
+                self.upsert(fname, resume, ingested_at=mtime)
+                total += 1
+        return total
+
+    def page(self, limit=10, cursor=None, offset=0, sort="filename", descending=False, fields=None):
+        """
+        Returns one page of resumes and the total count.
+
+        Args:
+            limit (int): Maximum number of resumes in the page.
+            cursor (str): `next_cursor` of the previous page. When given, `offset` is ignored and the page starts
+                right after the last resume of the previous page, with the sort order of that page.
+            offset (int): Number of resumes to skip, for clients that do not use cursors.
+            sort (str): One of SORT_COLUMNS.
+            descending (bool): Sort in descending order.
+            fields (list[str]): ResumeData fields to return in each content. Defaults to the full content; when every
+                field is part of SUMMARY_FIELDS, only the summary projection is read.
+
+        Returns:
+            tuple: (total, rows, next_cursor), where rows are dicts with filename, ingested_at and content, and
+            next_cursor is None on the last page.
+
+        Raises:
+            ValueError: If the sort key or the cursor is invalid.
+        """
+        if cursor is not None:
+            sort, descending, after_value, after_filename = decode_cursor(cursor)
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Invalid sort: {sort}")
+        column = SORT_COLUMNS[sort]
+        direction = "DESC" if descending else "ASC"
+        source = "summary" if fields and all(field in SUMMARY_FIELDS for field in fields) else "content"
+
+        query = f"SELECT filename, ingested_at, {column}, {source} FROM catalog"
+        params = []
+        if cursor is not None:
+            query += f" WHERE ({column}, filename) {'<' if descending else '>'} (?, ?)"
+            params.extend([after_value, after_filename])
+        query += f" ORDER BY {column} {direction}, filename {direction} LIMIT ?"
+        params.append(limit)
+        if cursor is None and offset:
+            query += " OFFSET ?"
+            params.append(offset)
+
+        with self._connect() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM catalog").fetchone()[0]
+            rows = conn.execute(query, params).fetchall()
+
+        resumes = []
+        for filename, ingested_at, _, data in rows:
+            content = json.loads(data)
+            if fields:
+                content = {field: content.get(field) for field in fields}
+            resumes.append({"filename": filename, "ingested_at": ingested_at, "content": content})
+
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = encode_cursor(sort, descending, rows[-1][2], rows[-1][0])
+        return total, resumes, next_cursor
@@ -1,45 +1,77 @@
 from langchain.tools import BaseTool
-from typing import Type
+from typing import Type, List, Tuple
 from pydantic import BaseModel, Field
 
 class RetrieveResumesInput(BaseModel):
     query: str = Field(description="Query to search for in resumes")
+    skills: List[str] = Field(default=[], description="Optional. Only search candidates that list ALL these skills (e.g. [\"Python\", \"AWS\"])")
+    languages: List[str] = Field(default=[], description="Optional. Only search candidates that speak ALL these languages (e.g. [\"English\"])")
 
 class RetrieveResumesTool(BaseTool):
+    """
+    Resume search tool used by the matching agent.
+
+    The retriever returns the best chunks; they are grouped by resume file, so each candidate appears once with all
+    its matching fragments and a score summing the retrieval scores of those fragments. Only the `max_candidates`
+    best candidates are returned, and the output stops growing once it reaches about `max_tokens` tokens.
+    """
     name: str = "retrieve_resumes"
-    description: str = "Search and return information about people resumes with source information."
+    description: str = "Search resumes and return the best matching candidates, each with its resume file name and the matching parts of the resume."
     args_schema: Type[BaseModel] = RetrieveResumesInput
+    response_format: str = "content_and_artifact"  #the artifact (files found) is not sent to the model, only to event listeners
     retriever: object = Field(exclude=True)  # Exclude from serialization
+    metadata_index: object = Field(default=None, exclude=True)
+    max_candidates: int = 5
+    max_tokens: int = 1500
     
-    def __init__(self, retriever, **kwargs):
-        super().__init__(retriever=retriever, **kwargs)
+    def __init__(self, retriever, metadata_index=None, **kwargs):
+        super().__init__(retriever=retriever, metadata_index=metadata_index, **kwargs)
     
-    def _run(self, query: str) -> str:
-        # Get documents from retriever
-        documents = self.retriever.invoke(query)
+    def _run(self, query: str, skills: List[str] = [], languages: List[str] = []) -> Tuple[str, List[str]]:
+        # Narrow the candidates with the structured index before ranking them by similarity
+        if self.metadata_index is not None and (skills or languages):
+            sources = self.metadata_index.search(skills=skills, languages=languages)
+            if not sources:
+                return f"No resumes list all of these skills {skills} and languages {languages}. Try fewer filters.", []
+            documents = self.retriever.invoke(query, sources=sources)
+        else:
+            documents = self.retriever.invoke(query)
         
-        # Format response with metadata
-        results = []
-        for doc in documents:
+        # Group the chunks by candidate (resume file), keeping each candidate's fragments in retrieval order
+        candidates = {}
+        for rank, doc in enumerate(documents):
             # Extract filename from source path
             source_file = doc.metadata.get('source', 'Unknown')
             if '/' in source_file:
                 source_file = source_file.split('/')[-1]
             
-            result = {
-                "content": doc.page_content,
-                "source": source_file,
-                "metadata": doc.metadata
-            }
-            results.append(result)
+            candidate = candidates.setdefault(source_file, {"name": doc.metadata.get("full_name"), "score": 0.0, "fragments": []})
+            # Chunks without a fused score (plain vector retriever) are scored by their rank
+            candidate["score"] += doc.metadata.get("retrieval_score", 1 / (60 + rank + 1))
+            content = doc.page_content
+            if candidate["name"] and content.startswith(f"{candidate['name']} | "):
+                content = content[len(candidate["name"]) + 3:]  #the name is already in the candidate header
+            if content not in candidate["fragments"]:
+                candidate["fragments"].append(content)
+        
+        best = sorted(candidates.items(), key=lambda item: item[1]["score"], reverse=True)[: self.max_candidates]
         
-        # Format as readable string for LLM
-        formatted_results = []
-        for i, result in enumerate(results, 1):
-            formatted_result = f"Document {i}:\nSource: {result['source']}\nContent: {result['content']}\n"
-            formatted_results.append(formatted_result)
+        # Format as readable string for LLM, within the token budget (~4 characters per token)
+        budget = self.max_tokens * 4
+        formatted_results, files = [], []
+        for i, (source_file, candidate) in enumerate(best, 1):
+            lines = [f"Candidate {i}: {candidate['name'] or 'Unknown'} (score {candidate['score']:.3f})", f"Source: {source_file}"]
+            lines.extend(f"- {fragment}" for fragment in candidate["fragments"])
+            formatted_result = "\n".join(lines)
+            if formatted_results and len(formatted_result) > budget:
+                break
+            formatted_results.append(formatted_result[:budget])
+            files.append(source_file)
+            budget -= len(formatted_result) + 5
+            if budget <= 0:
+                break
         
-        return "\n---\n".join(formatted_results)
+        return "\n---\n".join(formatted_results), files
 
 # Usage
 #retriever_tool = RetrieveResumesTool(retriever=retriever)
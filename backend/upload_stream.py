@@ -0,0 +1,143 @@
+import hashlib, os, tempfile
+from dataclasses import dataclass
+import aiofiles
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+class UploadError(Exception):
+    """A rejected upload, with the HTTP status code to answer (400 or 413)."""
+
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+@dataclass
+class SpooledUpload:
+    filename: str
+    content_type: str
+    path: str
+    size: int
+    sha256: str
+
+async def receive_uploads(request, dest_dir, allowed_types, max_file_bytes, max_request_bytes, chunk_size=1024 * 1024,
+                          field_name="files"):
+    """
+    Reads a multipart/form-data request as it arrives, writing every file of `field_name` straight into `dest_dir`.
+
+    Nothing is buffered beyond `chunk_size` bytes per file, and every file is written to disk only once, in writes of
+    about `chunk_size` bytes. The content type is checked as soon as the part headers arrive, and the size limits while
+    the body streams (or up front from Content-Length), so oversized uploads are rejected before being fully received.
+    The SHA-256 of each file is computed on the way.
+
+    Args:
+        request (Request): The incoming request.
+        dest_dir (str): Folder for the uploaded files, saved under random names with the original extension.
+        allowed_types (list): Accepted content types.
+        max_file_bytes (int): Maximum size of each file.
+        max_request_bytes (int): Maximum size of the whole request body.
+        chunk_size (int): Bytes accumulated before each write to disk.
+        field_name (str): Form field holding the files; other fields are ignored.
+
+    Returns:
+        list[SpooledUpload]: The saved files, in the order they were sent.
+
+    Raises:
+        UploadError: 400 for a malformed body, an unsupported file type or no file, 413 when a limit is exceeded.
+            The files already written by this request are removed.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError(400, "Expected a multipart/form-data body")
+    declared_length = request.headers.get("content-length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > max_request_bytes:
+        raise UploadError(413, f"Request larger than {max_request_bytes / (1024 * 1024):g} MB")
+
+    # The parser callbacks are synchronous, so they only record events, handled after each chunk of the body
+    events, header = [], {"field": b"", "value": b"", "headers": {}}
+
+    def on_header_field(data, start, end):
+        header["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        header["value"] += data[start:end]
+
+    def on_header_end():
+        header["headers"][header["field"].lower()] = header["value"]
+        header["field"], header["value"] = b"", b""
+
+    def on_headers_finished():
+        events.append(("begin", header["headers"]))
+        header["headers"] = {}
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end", None)),
+    })
+
+    uploads, current, received = [], None, 0
+    try:
+        async for body_chunk in request.stream():
+            received += len(body_chunk)
+            if received > max_request_bytes:
+                raise UploadError(413, f"Request larger than {max_request_bytes / (1024 * 1024):g} MB")
+            try:
+                parser.write(body_chunk)
+            except Exception:
+                raise UploadError(400, "Malformed multipart body")
+
+            for kind, value in events:
+                if kind == "begin":
+                    _, disposition = parse_options_header(value.get(b"content-disposition", b""))
+                    filename = disposition.get(b"filename")
+                    if disposition.get(b"name", b"").decode() != field_name or filename is None:
+                        continue  #not a file of the expected field, its data is skipped
+                    filename = filename.decode("utf-8", "replace")
+                    part_type = value.get(b"content-type", b"").decode()
+                    if part_type not in allowed_types:
+                        raise UploadError(400, f"Unsupported file type: {part_type}")
+                    suffix = "." + filename.split(".")[-1]
+                    path = os.path.join(dest_dir, next(tempfile._get_candidate_names()) + suffix)
+                    current = {
+                        "upload": SpooledUpload(filename, part_type, path, 0, ""),
+                        "file": await aiofiles.open(path, "wb"),
+                        "hash": hashlib.sha256(),
+                        "buffer": [],
+                        "buffered": 0,
+                    }
+                    uploads.append(current["upload"])
+                elif current is None:
+                    continue
+                elif kind == "data":
+                    current["upload"].size += len(value)
+                    if current["upload"].size > max_file_bytes:
+                        raise UploadError(413, f"{current['upload'].filename} is larger than {max_file_bytes / (1024 * 1024):g} MB")
+                    current["hash"].update(value)
+                    current["buffer"].append(value)
+                    current["buffered"] += len(value)
+                    if current["buffered"] >= chunk_size:
+                        await current["file"].write(b"".join(current["buffer"]))
+                        current["buffer"], current["buffered"] = [], 0
+                else:  #end of the part
+                    await current["file"].write(b"".join(current["buffer"]))
+                    await current["file"].close()
+                    current["upload"].sha256 = current["hash"].hexdigest()
+                    current = None
+            events.clear()
+
+        parser.finalize()
+        if current is not None:
+            raise UploadError(400, "Malformed multipart body")
+        if not uploads:
+            raise UploadError(400, "No files uploaded")
+    except BaseException:
+        if current is not None:
+            await current["file"].close()
+        for upload in uploads:
+            if os.path.exists(upload.path):
+                os.remove(upload.path)
+        raise
+    return uploads
@@ -0,0 +1,111 @@
+import json, os, sqlite3, threading, time, uuid
+from contextlib import contextmanager
+
+class UserStore:
+    """
+    User accounts stored in a local SQLite file, replacing the old users.json.
+
+    The token (user UUID) column is indexed, and token lookups are kept in an in-process cache for
+    `token_cache_ttl` seconds, so authenticating a request does not touch the disk most of the time. Every write is a
+    single SQLite transaction, so concurrent registrations can no longer overwrite each other.
+
+    Args:
+        db_path (str): SQLite file holding the users.
+        token_cache_ttl (float): Seconds a token lookup stays cached.
+        legacy_file (str, optional): users.json to import once, the first time the store is created.
+    """
+
+    def __init__(self, db_path, token_cache_ttl=60, legacy_file=None):
+        self.db_path = db_path
+        self.token_cache_ttl = token_cache_ttl
+        self._token_cache = {}
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    password TEXT NOT NULL,
+                    uuid TEXT NOT NULL UNIQUE
+                )
+                """
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if legacy_file is not None:
+            self.migrate_from_json(legacy_file)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def migrate_from_json(self, path):
+        """
+        Imports the users of a users.json file once. Returns the number of users imported.
+        The migration is claimed and done in one transaction, so when several workers start together only one imports
+        the file, and a failed import is tried again on the next start.
+        """
+        if not os.path.exists(path):
+            return 0
+        with self._connect() as conn:
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('migrated_from_json', ?)", (path,)).rowcount
+            if not claimed:
+                return 0
+            with open(path) as f:
+                users = json.load(f)
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password, uuid) VALUES (?, ?, ?)",
+                [(username, data["password"], data["uuid"]) for username, data in users.items()],
+            )
+        return len(users)
+
+    def create(self, username, password_hash):
+        """Creates a user and returns its UUID, or None if the username is already taken."""
+        user_uuid = str(uuid.uuid4())
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO users (username, password, uuid) VALUES (?, ?, ?)",
+                    (username, password_hash, user_uuid),
+                )
+        except sqlite3.IntegrityError:
+            return None
+        return user_uuid
+
+    def get(self, username):
+        """Returns {"username", "password", "uuid"} for a user, or None if it does not exist."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT username, password, uuid FROM users WHERE username = ?", (username,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def set_password(self, username, password_hash):
+        """Updates the password hash of a user. Returns False if the user does not exist."""
+        with self._connect() as conn:
+            cursor = conn.execute("UPDATE users SET password = ? WHERE username = ?", (password_hash, username))
+        return cursor.rowcount > 0
+
+    def username_for_token(self, token):
+        """Returns the username owning a token (UUID), or None if no user has it."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._token_cache.get(token)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT username FROM users WHERE uuid = ?", (token,)).fetchone()
+        if row is None:
+            return None  #misses are not cached, so a user registered by another process is found right away
+
+        with self._lock:
+            if len(self._token_cache) > 10000:
+                self._token_cache = {key: value for key, value in self._token_cache.items() if value[1] > now}
+            self._token_cache[token] = (row["username"], now + self.token_cache_ttl)
+        return row["username"]
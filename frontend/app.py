@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+from requests_toolbelt import MultipartEncoder
 import json
 import os
 from typing import List, Optional
@@ -17,10 +18,21 @@ if "username" not in st.session_state:
 if "authenticated" not in st.session_state:
     st.session_state.authenticated = False
 
-def make_api_request(endpoint: str, method: str = "GET", data: dict = None, files: dict = None, params: dict = None) -> dict:
-    """Make API request with proper error handling"""
+def forwarded_for(headers: dict) -> dict:
+    """Adds the browser address as X-Forwarded-For, so the API rate limits each user instead of this server"""
+    context = getattr(st, "context", None)
+    chain = [
+        getattr(context, "headers", {}).get("X-Forwarded-For"),  #proxies in front of Streamlit, if any
+        getattr(context, "ip_address", None),  #None for localhost connections
+    ]
+    if any(chain):
+        headers["X-Forwarded-For"] = ", ".join(address for address in chain if address)
+    return headers
+
+def make_api_request(endpoint: str, method: str = "GET", data: dict = None, files: list = None, params: dict = None) -> dict:
+    """Make API request with proper error handling. `files` is a list of (field, (name, file object, type)), streamed as multipart"""
     url = f"{API_BASE_URL}{endpoint}"
-    headers = {}
+    headers = forwarded_for({})
     
     if st.session_state.user_uuid:
         headers["X-Token"] = st.session_state.user_uuid
@@ -30,7 +42,10 @@ def make_api_request(endpoint: str, method: str = "GET", data: dict = None, file
             response = requests.get(url, headers=headers, params=params)
         elif method == "POST":
             if files:
-                response = requests.post(url, headers=headers, files=files, data=data)
+                # Streams the body from the file objects instead of building it in memory, and keeps repeated fields
+                encoder = MultipartEncoder(fields=list((data or {}).items()) + files)
+                headers["Content-Type"] = encoder.content_type
+                response = requests.post(url, headers=headers, data=encoder)
             else:
                 headers["Content-Type"] = "application/json"
                 response = requests.post(url, headers=headers, json=data)
@@ -40,12 +55,39 @@ def make_api_request(endpoint: str, method: str = "GET", data: dict = None, file
         
         if response.status_code == 200:
             return {"success": True, "data": response.json()}
+        elif response.status_code == 413:
+            try:
+                detail = response.json().get("detail")
+            except ValueError:  #rejected by a proxy before reaching the API
+                detail = None
+            return {"success": False, "error": f"Upload too large: {detail or 'the size limit was exceeded'}"}
         else:
             return {"success": False, "error": response.json().get("detail", "Unknown error")}
     
     except requests.exceptions.RequestException as e:
         return {"success": False, "error": f"Connection error: {str(e)}"}
 
+def stream_api_request(endpoint: str, data: dict):
+    """POST to a Server-Sent Events endpoint, yielding (event, data) pairs as they arrive"""
+    headers = forwarded_for({"Content-Type": "application/json", "Accept": "text/event-stream"})
+    if st.session_state.user_uuid:
+        headers["X-Token"] = st.session_state.user_uuid
+    
+    try:
+        with requests.post(f"{API_BASE_URL}{endpoint}", headers=headers, json=data, stream=True) as response:
+            if response.status_code != 200:
+                yield "error", {"detail": response.json().get("detail", "Unknown error")}
+                return
+            event = "message"
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    yield event, json.loads(line[len("data:"):])
+                    event = "message"
+    except requests.exceptions.RequestException as e:
+        yield "error", {"detail": f"Connection error: {str(e)}"}
+
 def login_page():
     """Login/Registration page"""
     st.title("🔐 Resume Processing System")
@@ -149,23 +191,41 @@ def upload_page():
         if st.button("Upload and Process"):
             files = []
             for uploaded_file in uploaded_files:
-                files.append(("files", (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)))
+                uploaded_file.seek(0)  #the file object itself is sent, read in chunks while uploading
+                files.append(("files", (uploaded_file.name, uploaded_file, uploaded_file.type)))
             
-            with st.spinner("Processing files... This may take a few minutes."):
-                result = make_api_request("/upload", "POST", files=dict(files))
+            with st.spinner("Uploading files..."):
+                result = make_api_request("/upload", "POST", files=files)
                 
                 if result["success"]:
-                    st.success("Files uploaded and processed successfully!")
-                    #st.json(result["data"])
-                    
-                    # Show processed files
-                    if "json_files" in result["data"]:
-                        st.subheader("Processed Files:")
-                        for json_file in result["data"]["json_files"]:
-                            st.write(f"✅ {json_file}")
+                    st.session_state.upload_batch_id = result["data"]["batch_id"]
+                    st.success("Files uploaded! They are being processed in the background.")
                 else:
                     st.error(f"Upload failed: {result['error']}")
 
+    if st.session_state.get("upload_batch_id"):
+        st.subheader("Processing Status")
+        st.caption(f"Batch: {st.session_state.upload_batch_id}")
+
+        if st.button("Refresh status"):
+            st.rerun()
+
+        result = make_api_request("/jobs", "GET", params={"batch_id": st.session_state.upload_batch_id})
+
+        if result["success"]:
+            status_icons = {"queued": "⏳", "running": "⚙️", "done": "✅", "failed": "❌"}
+            for job in result["data"]:
+                line = f"{status_icons.get(job['status'], '')} {job['filename']} - {job['status']}"
+                if job["status"] == "running" and job.get("stage"):
+                    line += f" ({job['stage']})"
+                elif job["status"] == "done" and job.get("result"):
+                    line += f" → {job['result'].get('json_file')}"
+                elif job["status"] == "failed" and job.get("error"):
+                    line += f": {job['error']}"
+                st.write(line)
+        else:
+            st.error(f"Failed to load status: {result['error']}")
+
 def resumes_page():
     """Browse resumes page"""
     st.header("📋 Browse Processed Resumes")
@@ -175,19 +235,41 @@ def resumes_page():
     with col1:
         limit = st.number_input("Items per page", min_value=1, max_value=100, value=10)
     with col2:
-        offset = st.number_input("Page offset", min_value=0, value=0)
+        sort = st.selectbox("Sort by", ["filename", "full_name", "ingested_at"])
     with col3:
-        if st.button("Refresh"):
-            st.rerun()
+        order = st.selectbox("Order", ["asc", "desc"])
+    
+    # Cursor pages: going back to the first page whenever the sort changes
+    if st.session_state.get("resumes_sort") != (sort, order):
+        st.session_state.resumes_sort = (sort, order)
+        st.session_state.resumes_cursor = None
     
-    # Fetch resumes
-    result = make_api_request("/resumes", "GET", params={"limit": limit, "offset": offset})
+    # Fetch only the summary fields shown below, which the API reads from its small summary projection
+    params = {
+        "limit": limit,
+        "sort": sort,
+        "order": order,
+        "fields": ["full_name", "email", "phone", "linkedin", "github", "professional_summary"]
+    }
+    if st.session_state.get("resumes_cursor"):
+        params["cursor"] = st.session_state.resumes_cursor
+    result = make_api_request("/resumes", "GET", params=params)
     
     if result["success"]:
         data = result["data"]
         st.write(f"Total resumes: {data['total']}")
         st.write(f"Showing {len(data['resumes'])} resume(s)")
         
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("First page", disabled=not st.session_state.get("resumes_cursor")):
+                st.session_state.resumes_cursor = None
+                st.rerun()
+        with col2:
+            if st.button("Next page", disabled=not data.get("next_cursor")):
+                st.session_state.resumes_cursor = data["next_cursor"]
+                st.rerun()
+        
         # Display resumes
         for i, resume in enumerate(data["resumes"]):
             with st.expander(f"📄 {resume['filename']} - {resume['content'].get('full_name', 'Unknown')}"):
@@ -271,31 +353,49 @@ def question_page():
     )
     
     if st.button("Ask Question") and question:
-        with st.spinner("Searching resumes and generating answer..."):
-            result = make_api_request("/question", "POST", {"query": question})
+        status = st.status("Searching resumes...", expanded=False)
+        st.subheader("Answer")
+        answer_placeholder = st.empty()
+        streamed_answer = ""
+        data = None
+        
+        # Show the agent steps and the answer while they are generated
+        for event, payload in stream_api_request("/question/stream", {"query": question}):
+            if event == "tool_call":
+                filters = ", ".join(payload.get("skills", []) + payload.get("languages", []))
+                status.write(f"🔎 Searching: {payload.get('query', '')}" + (f" (filters: {filters})" if filters else ""))
+            elif event == "tool_result":
+                status.write(f"📄 Found: {', '.join(payload['files']) or 'no resumes'}")
+            elif event == "token":
+                streamed_answer += payload["text"]
+                answer_placeholder.markdown(streamed_answer + "▌")
+            elif event == "answer":
+                data = payload
+            elif event == "error":
+                status.update(label="Failed", state="error")
+                answer_placeholder.empty()
+                st.error(f"Failed to get answer: {payload['detail']}")
+        
+        if data is not None:
+            status.update(label="Done", state="complete")
             
-            if result["success"]:
-                data = result["data"]
-                
-                # Display answer
-                st.subheader("Answer")
-                st.markdown(data.get("answer", "No answer provided"))
-                
-                # Display referenced files
-                if data.get("files"):
-                    st.subheader("Referenced Files")
-                    for file in data["files"]:
-                        st.write(f"📄 {file}")
-                
-                # Download links
-                if data.get("file_urls"):
-                    st.subheader("Download Files")
-                    for url in data["file_urls"]:
-                        filename = url.split("/")[-1].split("?")[0]
-                        st.markdown(f"[📥 Download {filename}]({url})")
-                
-            else:
-                st.error(f"Failed to get answer: {result['error']}")
+            # Display answer
+            answer_placeholder.markdown(data.get("answer", "No answer provided"))
+            if data.get("cached"):
+                st.caption("Answer reused from a similar previous question.")
+            
+            # Display referenced files
+            if data.get("files"):
+                st.subheader("Referenced Files")
+                for file in data["files"]:
+                    st.write(f"📄 {file}")
+            
+            # Download links
+            if data.get("file_urls"):
+                st.subheader("Download Files")
+                for url in data["file_urls"]:
+                    filename = url.split("/")[-1].split("?")[0]
+                    st.markdown(f"[📥 Download {filename}]({url})")
 
 def main():
     """Main application"""
@@ -361,7 +461,7 @@ def main():
             - **OCR**: PaddleOCR
             - **AI**: Google Gemini and LangChain
             - **Vector Store**: Chroma
-            - **Database**: TinyDB for logging
+            - **Audit Log**: JSON Lines files written in the background
             """)
 
 if __name__ == "__main__":